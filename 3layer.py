@@ -1,14 +1,25 @@
-from ui_device import display_device_management
-from users import User
-from devices import Device
-from queries import find_devices
+from models import User, Device, MaintenanceJobs, ReservationConflictError, UserHasDevicesError
 import streamlit as st
-from tinydb import TinyDB
-from datetime import datetime, timedelta
+import instrumentation
+from datetime import date, timedelta
 
-# Datenbank initialisieren
-DB_PATH = 'device_management_db.json'
-db = TinyDB(DB_PATH)
+# Anzahl der Reservierungen pro Seite
+PAGE_SIZE = 50
+
+
+def reservation_page(key, reserver=None):
+    """Zeitraum-Auswahl und Seitennavigation; liefert nur die Reservierungen der aktuellen Seite."""
+    col_start, col_end = st.columns(2)
+    window_start = col_start.date_input("Von", date.today(), key=f"{key}_von")
+    window_end = col_end.date_input("Bis", date.today() + timedelta(days=90), key=f"{key}_bis")
+    total = Device.count_reservations(window_start, window_end, reserver=reserver)
+    pages = max((total - 1) // PAGE_SIZE + 1, 1)
+    page = st.number_input(f"Seite (von {pages}, {total} Einträge)", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_seite")
+    return Device.query_reservations(window_start, window_end, reserver=reserver, limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE)
+
+
+# Performance-Messung des Durchlaufs (nur mit DEVICE_PERF=1)
+instrumentation.begin_rerun()
 
 # Initialisierung des Frontends
 st.title("Geräte-Verwaltung System (Drei-Schichten-Architektur)")
@@ -18,6 +29,7 @@ menu = st.sidebar.selectbox("Menü", ["Nutzer-Verwaltung", "Geräte-Verwaltung",
 if menu == "Nutzer-Verwaltung":
     st.header("Nutzer-Verwaltung")
     action = st.radio("Aktion", ["Nutzer anlegen", "Nutzer anzeigen", "Nutzer entfernen"])
+    instrumentation.set_action(menu, action)
 
     if action == "Nutzer anlegen":
         name = st.text_input("Name")
@@ -36,18 +48,33 @@ if menu == "Nutzer-Verwaltung":
             st.write("Keine Nutzer gefunden.")
 
     elif action == "Nutzer entfernen":
-        user_id = st.selectbox("Wähle Nutzer zur Entfernung", [u.id for u in User.find_all()])
+        user_ids = User.project("id")
+        user_id = st.selectbox("Wähle Nutzer zur Entfernung", user_ids)
+        managed_devices = Device.find_managed_by(user_id) if user_id else []
+        reassign_to, cascade = None, False
+        if managed_devices:
+            st.write(f"Verantwortlich für {len(managed_devices)} Gerät(e): "
+                     + ", ".join(d.device_name for d in managed_devices[:10])
+                     + (" …" if len(managed_devices) > 10 else ""))
+            if st.radio("Geräte", ["An anderen Nutzer übertragen", "Mit Reservierungen entfernen"]) == "Mit Reservierungen entfernen":
+                cascade = True
+            else:
+                reassign_to = st.selectbox("Neuer Verantwortlicher", [u for u in user_ids if u != user_id])
         if st.button("Entfernen"):
-            User.delete(user_id)
-            st.success("Nutzer wurde erfolgreich entfernt.")
+            try:
+                User.delete(user_id, reassign_to=reassign_to, cascade=cascade)
+                st.success("Nutzer wurde erfolgreich entfernt.")
+            except UserHasDevicesError as e:
+                st.error(str(e))
 
 elif menu == "Geräte-Verwaltung":
     st.header("Geräte-Verwaltung")
-    action = st.radio("Aktion", ["Gerät anlegen", "Geräte anzeigen"])
+    action = st.radio("Aktion", ["Gerät anlegen", "Geräte anzeigen", "Gerät entfernen"])
+    instrumentation.set_action(menu, action)
 
     if action == "Gerät anlegen":
         device_name = st.text_input("Gerätename")
-        responsible_person = st.selectbox("Verantwortlicher Nutzer", [u.id for u in User.find_all()])
+        responsible_person = st.selectbox("Verantwortlicher Nutzer", User.project("id"))
         end_of_life = st.date_input("End-of-Life Datum", key="end_of_life")
         maintenance_interval = st.number_input("Wartungsintervall (Tage)", min_value=1, step=1, key="maintenance_interval")
         first_maintenance = st.date_input("Erstes Wartungsdatum", key="first_maintenance")
@@ -61,12 +88,9 @@ elif menu == "Geräte-Verwaltung":
                 first_maintenance=str(first_maintenance),
             )
             device.store_data()
-            # Automatische Reservierungen für Wartungstage
-            current_date = first_maintenance
-            while current_date <= end_of_life:
-                device.add_reservation("Maintenance", current_date, current_date)
-                current_date += timedelta(days=maintenance_interval)
-            st.success("Gerät wurde erfolgreich angelegt und Wartungstage reserviert.")
+            # Die Wartungsregel legt der Hintergrund-Worker an (maintenance_worker.py)
+            MaintenanceJobs.enqueue([device.device_name])
+            st.success("Gerät wurde erfolgreich angelegt, die Wartungstage werden im Hintergrund eingeplant.")
 
     elif action == "Geräte anzeigen":
         devices = Device.find_all()
@@ -76,12 +100,19 @@ elif menu == "Geräte-Verwaltung":
         else:
             st.write("Keine Geräte gefunden.")
 
+    elif action == "Gerät entfernen":
+        device_name = st.selectbox("Wähle Gerät zur Entfernung", Device.project("device_name"))
+        if st.button("Entfernen"):
+            Device.delete(device_name)
+            st.success("Gerät wurde samt Reservierungen erfolgreich entfernt.")
+
 elif menu == "Reservierungssystem":
     st.header("Reservierungssystem")
     action = st.radio("Aktion", ["Reservierung eintragen", "Reservierungen anzeigen", "Reservierung entfernen"])
+    instrumentation.set_action(menu, action)
 
     if action == "Reservierung eintragen":
-        devices = [d.device_name for d in Device.find_all()]
+        devices = Device.project("device_name")
         if devices:
             device_name = st.selectbox("Gerät auswählen", devices)
             loaded_device = Device.find_by_attribute("device_name", device_name)
@@ -91,22 +122,25 @@ elif menu == "Reservierungssystem":
                 start_date = st.date_input("Startdatum")
                 end_date = st.date_input("Enddatum")
                 if st.button("Reservierung speichern"):
-                    loaded_device.add_reservation(reserver, start_date, end_date)
-                    st.success("Reservierung wurde gespeichert.")
+                    try:
+                        loaded_device.add_reservation(reserver, start_date, end_date)
+                        st.success("Reservierung wurde gespeichert.")
+                    except ReservationConflictError as e:
+                        st.error(f"{e} Nächster freier Zeitraum ab {Device.next_free_slot(device_name, max((end_date - start_date).days + 1, 1), start_date)}.")
             else:
                 st.error("Gerät nicht gefunden.")
         else:
             st.warning("Keine Geräte vorhanden.")
 
     elif action == "Reservierungen anzeigen":
-        reservations = Device.get_reservations()
+        reservations = Device.join_devices(reservation_page("reservierungen"))
         if reservations:
-            st.table(reservations)
+            st.table([{"Gerät": r['device_name'], "Reservierer": r['reserver'], "Startdatum": r['start_date'], "Enddatum": r['end_date'], "Verantwortlicher": r['managed_by_user_id']} for r in reservations])
         else:
             st.write("Keine Reservierungen gefunden.")
 
     elif action == "Reservierung entfernen":
-        reservations = Device.get_reservations()
+        reservations = reservation_page("reservierung_entfernen")
         if reservations:
             reservation_to_remove = st.selectbox("Wähle Reservierung zur Entfernung", [f"{r['device_name']} - {r['start_date']}" for r in reservations])
             if st.button("Reservierung entfernen"):
@@ -116,34 +150,61 @@ elif menu == "Reservierungssystem":
 
 elif menu == "Wartungs-Management":
     st.header("Wartungs-Management")
-    maintenance_action = st.radio("Aktion", ["Wartungen anzeigen", "Wartung hinzufügen", "Wartung entfernen"])
+    maintenance_action = st.radio("Aktion", ["Wartungen anzeigen", "Wartungskosten anzeigen", "Wartung hinzufügen", "Wartung entfernen", "Wartungsplanung"])
+    instrumentation.set_action(menu, maintenance_action)
 
     if maintenance_action == "Wartungen anzeigen":
-        devices = Device.find_all()
-        maintenance_data = [
-            {"Gerät": d.device_name, "Nächste Wartung": datetime.strptime(d.first_maintenance, "%Y-%m-%d").strftime("%d.%m.%Y")}
-            for d in devices
-        ]
-        st.table(maintenance_data)
+        as_of = st.date_input("Stichtag", value=date.today(), key="wartung_stichtag")
+        weeks = st.number_input("Vorschau (Wochen)", min_value=1, max_value=104, value=12, key="wartung_wochen")
+        st.table(Device.get_maintenance_schedule(as_of))
+        st.subheader("Fällige Wartungen pro Woche")
+        st.bar_chart(Device.maintenance_schedule().load_calendar(
+            as_of, as_of + timedelta(weeks=weeks) - timedelta(days=1), freq="W", as_dataframe=True))
+
+    elif maintenance_action == "Wartungskosten anzeigen":
+        st.write(f"Wartungskosten pro Jahr: {Device.calculate_total_maintenance_cost():.2f} EUR")
+        st.subheader("Je Verantwortlichem")
+        st.table([{"Verantwortlicher": user, "Kosten pro Jahr (EUR)": round(cost, 2)}
+                  for user, cost in sorted(Device.maintenance_cost_by_user().items(), key=lambda item: str(item[0]))])
+        st.subheader(f"Je Monat ({date.today().year})")
+        st.bar_chart({"Kosten (EUR)": Device.maintenance_cost_by_month()})
 
     elif maintenance_action == "Wartung hinzufügen":
-        devices = [d.device_name for d in Device.find_all()]
+        devices = Device.project("device_name")
         if devices:
             device_name = st.selectbox("Gerät auswählen", devices, key="wartung_hinzufügen")
             loaded_device = Device.find_by_attribute("device_name", device_name)
             if loaded_device:
                 maintenance_date = st.date_input("Wartungsdatum", key="wartungsdatum_hinzufügen")
                 if st.button("Wartung speichern"):
-                    loaded_device.add_reservation("Maintenance", maintenance_date, maintenance_date)
-                    st.success("Wartung wurde hinzugefügt und das Gerät für 'Maintenance' reserviert.")
+                    try:
+                        loaded_device.add_reservation("Maintenance", maintenance_date, maintenance_date)
+                        st.success("Wartung wurde hinzugefügt und das Gerät für 'Maintenance' reserviert.")
+                    except ReservationConflictError as e:
+                        st.error(str(e))
 
     elif maintenance_action == "Wartung entfernen":
-        reservations = Device.get_reservations()
+        reservations = reservation_page("wartung", reserver="Maintenance")
         if reservations:
-            reservation_to_remove = st.selectbox("Wähle Wartung zur Entfernung", [f"{r['device_name']} - {r['start_date']}" for r in reservations if r['reserver'] == "Maintenance"])
+            reservation_to_remove = st.selectbox("Wähle Wartung zur Entfernung", [f"{r['device_name']} - {r['start_date']}" for r in reservations])
             if st.button("Wartung entfernen"):
                 device_name, start_date = reservation_to_remove.split(" - ")
                 Device.remove_reservation(device_name, start_date)
                 st.success("Wartung wurde entfernt und die Reservierung für 'Maintenance' gelöscht.")
 
-
+    elif maintenance_action == "Wartungsplanung":
+        progress = MaintenanceJobs.progress()
+        finished = progress["done"] + progress["failed"]
+        total = finished + progress["pending"] + progress["running"]
+        st.progress(finished / total if total else 1.0,
+                    text=f"{finished} von {total} Aufträgen abgeschlossen, {progress['pending']} wartend")
+        st.write(f"Letzter Abschluss: {progress['last_finished'] or '–'}")
+        if progress["failed_jobs"]:
+            st.subheader("Fehlgeschlagen")
+            st.table([{"Gerät": job["device_name"], "Zeitpunkt": job["finished"], "Fehler": job["error"]}
+                      for job in progress["failed_jobs"]])
+        if st.button("Horizont jetzt fortschreiben"):
+            from maintenance_worker import roll_forward
+            st.success(f"{roll_forward()} Aufträge angelegt; sie werden vom Worker (maintenance_worker.py) abgearbeitet.")
+
+instrumentation.render_panel(instrumentation.end_rerun())
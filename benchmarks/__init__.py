@@ -0,0 +1,6 @@
+"""Benchmarks für die Modellschicht (Device, User) und die Streamlit-Abläufe.
+
+- `benchmarks.generate`: erzeugt synthetische `device_management_db.json`-Datensätze
+- `benchmarks.run`: misst die Szenarien und schreibt/vergleicht JSON-Ergebnisse
+- `benchmarks.bench_serialization`: Vergleich der Serialisierungs-Middlewares
+"""
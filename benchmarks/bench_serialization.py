@@ -0,0 +1,76 @@
+"""Vergleich SerializationMiddleware (tinydb_serialization) gegen FastSerializationMiddleware.
+
+Aufruf aus dem Projektverzeichnis: python -m benchmarks.bench_serialization [--documents 100000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from tinydb import TinyDB
+from fast_serializer import FastSerializationMiddleware
+from serializer import serializer
+
+
+def write_dataset(path, documents):
+    """Schreibt `documents` Reservierungen und 1000 Geräte mit `{TinyDate}`-Tags."""
+    start = date(2025, 1, 1)
+    reservations = {
+        str(i): {
+            "device_name": f"device-{i % 1000}",
+            "reserver": "Maintenance",
+            "start_date": f"{{TinyDate}}:{start + timedelta(days=i // 1000)}",
+            "end_date": f"{{TinyDate}}:{start + timedelta(days=i // 1000)}",
+        }
+        for i in range(1, documents + 1)
+    }
+    devices = {
+        str(i): {
+            "device_name": f"device-{i}",
+            "managed_by_user_id": f"user-{i % 50}@mail",
+            "end_of_life": "{TinyDate}:2030-01-01",
+            "maintenance_interval": 7,
+            "first_maintenance": "{TinyDate}:2025-01-01",
+        }
+        for i in range(1, 1001)
+    }
+    with open(path, "w") as f:
+        json.dump({"devices": devices, "reservations": reservations, "users": {}}, f)
+
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(path, storage):
+    """Misst die typischen Zugriffe einer Streamlit-Seite mit einem frischen Datenbank-Handle."""
+    db = TinyDB(path, storage=storage)
+    results = {
+        "devices_all": _timed(lambda: db.table("devices").all()),
+        "reservations_all": _timed(lambda: db.table("reservations").all()),
+        "insert_user": _timed(lambda: db.table("users").insert({"id": "bench@mail", "name": "Bench"})),
+        "devices_all_after_write": _timed(lambda: db.table("devices").all()),
+    }
+    db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=100_000)
+    args = parser.parse_args()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench_db.json")
+        for name, storage in (("SerializationMiddleware", serializer),
+                              ("FastSerializationMiddleware", FastSerializationMiddleware())):
+            write_dataset(path, args.documents)
+            results[name] = run(path, storage)
+    print(json.dumps({"documents": args.documents, "seconds": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Erzeugt realistische Testdatensätze im Format von `device_management_db.json`.
+
+Aufruf: python -m benchmarks.generate bench_db.json --users 100 --devices 1000 --reservations 1000000
+"""
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+DEFAULT_INTERVALS = (1, 7, 14, 30, 90, 180, 365)
+
+
+def generate_dataset(path, users=100, devices=1000, reservations=100_000, intervals=DEFAULT_INTERVALS,
+                     maintenance_rules=True, seed=42, start=date(2025, 1, 1)):
+    """Schreibt den Datensatz nach `path` und gibt die Anzahl der Einträge je Tabelle zurück.
+
+    Die Reservierungen werden zeilenweise geschrieben, damit auch 1M Einträge mit
+    konstantem Speicher erzeugt werden. Reservierungen eines Geräts überschneiden
+    sich nicht; jedes Gerät bekommt bei `maintenance_rules` eine Wartungsregel.
+    """
+    rng = random.Random(seed)
+    user_ids = [f"user{i}@hochschule.example" for i in range(1, users + 1)]
+    device_names = [f"geraet-{i:06d}" for i in range(1, devices + 1)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"users": ')
+        json.dump({str(i): {"id": user_id, "name": f"Nutzer {i}"} for i, user_id in enumerate(user_ids, 1)}, f)
+
+        f.write(', "devices": ')
+        device_docs = {}
+        for i, name in enumerate(device_names, 1):
+            first_maintenance = start + timedelta(days=rng.randint(0, 60))
+            device_docs[str(i)] = {
+                "device_name": name,
+                "managed_by_user_id": rng.choice(user_ids) if user_ids else "",
+                "end_of_life": str(first_maintenance + timedelta(days=rng.randint(365, 5 * 365))),
+                "maintenance_interval": rng.choice(intervals),
+                "first_maintenance": str(first_maintenance),
+            }
+        json.dump(device_docs, f)
+
+        f.write(', "maintenance_rules": {')
+        if maintenance_rules:
+            f.write(", ".join(
+                json.dumps(str(i)) + ": " + json.dumps({
+                    "device_name": d["device_name"], "start": d["first_maintenance"],
+                    "interval": d["maintenance_interval"], "end": d["end_of_life"], "exceptions": [],
+                })
+                for i, d in device_docs.items()
+            ))
+        f.write('}, "reservations": {')
+        next_free = {name: start for name in device_names}
+        for i in range(1, reservations + 1):
+            name = rng.choice(device_names)
+            begin = next_free[name] + timedelta(days=rng.randint(0, 10))
+            end = begin + timedelta(days=rng.randint(0, 5))
+            next_free[name] = end + timedelta(days=1)
+            if i > 1:
+                f.write(", ")
+            f.write(json.dumps(str(i)) + ": " + json.dumps({
+                "device_name": name, "reserver": rng.choice(user_ids) if user_ids else "Maintenance",
+                "start_date": str(begin), "end_date": str(end),
+            }))
+        f.write("}}")
+    return {"users": users, "devices": devices, "reservations": reservations,
+            "maintenance_rules": devices if maintenance_rules else 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--reservations", type=int, default=100_000)
+    parser.add_argument("--intervals", type=int, nargs="+", default=list(DEFAULT_INTERVALS))
+    parser.add_argument("--no-maintenance-rules", dest="maintenance_rules", action="store_false")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(generate_dataset(args.path, args.users, args.devices, args.reservations, tuple(args.intervals),
+                           args.maintenance_rules, args.seed))
+
+
+if __name__ == "__main__":
+    main()
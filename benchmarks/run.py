@@ -0,0 +1,180 @@
+"""Misst die Modellschicht und die Streamlit-Abläufe auf einem synthetischen Datensatz.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.run --reservations 100000 --output results.json
+    python -m benchmarks.run --reservations 100000 --compare results.json
+
+Engine und Storage werden wie in der App über DEVICE_DB_ENGINE / DEVICE_DB_STORAGE gewählt.
+Jedes Szenario wird einmal mit kaltem Cache (`cold`) und danach `--repeat` mal
+(`warm_median`, `warm_min`) gemessen; alle Zeiten in Sekunden.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from benchmarks.generate import generate_dataset
+
+
+def scenarios(Device, User, find_devices):
+    """Die gemessenen Abläufe als `name -> Funktion(i)`; `i` ist die Nummer der Wiederholung."""
+    device_names = [d.device_name for d in Device.find_all()]
+    reservations = Device.query_reservations(limit=10_000)
+    window_start = date(2025, 3, 1)
+
+    def create_device(i, materialize):
+        device = Device(
+            device_name=f"bench-{'m' if materialize else 'r'}-{i}",
+            managed_by_user_id="bench@mail",
+            end_of_life=str(date(2030, 1, 1)),
+            maintenance_interval=1,
+            first_maintenance=str(date(2025, 1, 1)),
+        )
+        device.store_data()
+        if materialize:
+            device.add_reservations(("Maintenance", d, d) for d in device.maintenance_dates())
+        else:
+            device.store_maintenance_rule()
+
+    return {
+        "Device.find_all": lambda i: Device.find_all(),
+        "Device.find_by_attribute": lambda i: Device.find_by_attribute(
+            "device_name", device_names[i % len(device_names)]),
+        "Device.get_reservations": lambda i: Device.get_reservations(),
+        "Device.get_reservations_window_30d": lambda i: Device.get_reservations(
+            window_start, window_start + timedelta(days=30)),
+        "Device.query_reservations_page": lambda i: Device.query_reservations(
+            window_start, window_start + timedelta(days=90), limit=50, offset=50 * (i % 5)),
+        "Device.remove_reservation": lambda i: Device.remove_reservation(
+            reservations[i]["device_name"], reservations[i]["start_date"]),
+        "Device.get_maintenance_schedule": lambda i: Device.get_maintenance_schedule(window_start),
+        "MaintenanceSchedule.load_calendar_52w": lambda i: Device.maintenance_schedule().load_calendar(
+            window_start, window_start + timedelta(weeks=52), freq="W"),
+        "User.find_all": lambda i: User.find_all(),
+        "queries.find_devices": lambda i: find_devices(),
+        "Device.project_device_name": lambda i: Device.project("device_name"),
+        "User.project_id": lambda i: User.project("id"),
+        "create_device_with_maintenance_rule": lambda i: create_device(i, materialize=False),
+        "create_device_with_materialized_series": lambda i: create_device(i, materialize=True),
+    }
+
+
+def measure(func, repeat, reset):
+    reset()
+    start = time.perf_counter()
+    func(0)
+    cold = time.perf_counter() - start
+    warm = []
+    for i in range(1, repeat + 1):
+        start = time.perf_counter()
+        func(i)
+        warm.append(time.perf_counter() - start)
+    return {
+        "cold": cold,
+        "warm_median": statistics.median(warm) if warm else None,
+        "warm_min": min(warm) if warm else None,
+        "repeat": repeat,
+    }
+
+
+def run(dataset_path, repeat=5, only=None):
+    """Führt alle Szenarien auf einer Kopie von `dataset_path` aus und gibt die Ergebnisse zurück."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "device_management_db.json")
+        shutil.copyfile(dataset_path, db_path)
+        # Die Module lesen die Konfiguration beim ersten Import
+        os.environ["DEVICE_DB_PATH"] = db_path
+        os.environ["DEVICE_DB_SQLITE_PATH"] = os.path.join(tmp, "device_management_db.sqlite")
+        import database
+        if database.DB_ENGINE == "sqlite":
+            from sqlite_engine import migrate_from_tinydb
+            migrate_from_tinydb(db_path, os.environ["DEVICE_DB_SQLITE_PATH"])
+        from models import Device, User
+        from queries import find_devices
+
+        results = {}
+        for name, func in scenarios(Device, User, find_devices).items():
+            if only and name not in only:
+                continue
+            results[name] = measure(func, repeat, database.invalidate)
+            print(f"{name:45s} cold {results[name]['cold']:.4f}s  warm {results[name]['warm_median']:.4f}s",
+                  file=sys.stderr)
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "engine": database.DB_ENGINE,
+                "storage": database.DB_STORAGE,
+            },
+            "results": results,
+        }
+
+
+def compare(current, baseline, threshold, min_delta=0.005):
+    """Vergleicht zwei Ergebnisdateien; gibt die Szenarien zurück, die um mehr als `threshold` langsamer sind.
+
+    Unterschiede unter `min_delta` Sekunden gelten als Messrauschen.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if not previous:
+            continue
+        for metric in ("cold", "warm_median"):
+            if previous.get(metric) and result.get(metric) is not None:
+                ratio = result[metric] / previous[metric]
+                regressed = ratio > threshold and result[metric] - previous[metric] > min_delta
+                flag = "REGRESSION" if regressed else ""
+                print(f"{name:45s} {metric:12s} {previous[metric]:.4f}s -> {result[metric]:.4f}s  x{ratio:.2f} {flag}")
+                if regressed:
+                    regressions.append((name, metric, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dataset", help="vorhandener Datensatz statt eines generierten")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--reservations", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scenario", action="append", help="nur diese Szenarien messen")
+    parser.add_argument("--output", help="Ergebnisse als JSON in diese Datei schreiben")
+    parser.add_argument("--compare", help="mit einer früheren Ergebnisdatei vergleichen")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Faktor, ab dem eine Verlangsamung als Regression gilt")
+    parser.add_argument("--min-delta", type=float, default=0.005,
+                        help="kleinere Unterschiede (Sekunden) gelten als Messrauschen")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(tmp, "dataset.json")
+            counts = generate_dataset(dataset, args.users, args.devices, args.reservations)
+        else:
+            counts = None
+        result = run(dataset, args.repeat, args.scenario)
+    result["meta"]["dataset"] = counts or {"path": args.dataset}
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.threshold, args.min_delta)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
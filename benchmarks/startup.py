@@ -0,0 +1,136 @@
+"""Misst die Startzeit: Import der Modelle, erste Darstellung von 3layer.py und ein Rerun.
+
+Aufruf aus dem Projektverzeichnis:
+    python -m benchmarks.startup --reservations 1000 --reservations 100000
+    python -m benchmarks.startup --output startup.json --compare startup_alt.json
+
+Jede Messung läuft in einem frischen Prozess (kalte Imports) auf einer Kopie des
+Datensatzes, Engine und Storage wie in der App über DEVICE_DB_ENGINE / DEVICE_DB_STORAGE.
+Der erste Prozess ergibt `cold`, die weiteren `--repeat` Prozesse `warm_median` und
+`warm_min`; alle Zeiten in Sekunden. Die Zeiten sollten nicht mit der Größe des
+Datensatzes wachsen, die Startseite liest die Datenbank nicht.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from benchmarks.generate import generate_dataset
+from benchmarks.run import compare
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Werden jeweils in einem frischen Interpreter im Projektverzeichnis ausgeführt und geben die Zeiten als JSON aus
+IMPORT_MODELS = """
+import json, time
+start = time.perf_counter()
+import models
+print(json.dumps({"import_models": time.perf_counter() - start}))
+"""
+
+RENDER = """
+import json, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("3layer.py", default_timeout=120)
+start = time.perf_counter()
+app.run()
+first_render = time.perf_counter() - start
+start = time.perf_counter()
+app.run()
+rerun = time.perf_counter() - start
+if app.exception:
+    raise SystemExit(app.exception[0].value)
+print(json.dumps({"first_render": first_render, "rerun": rerun}))
+"""
+
+
+def _child(code, env):
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"Messprozess fehlgeschlagen: {result.stderr.strip()[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(dataset_path, repeat=5):
+    """Misst alle Startphasen auf einer Kopie von `dataset_path`; gibt `name -> Messwerte` zurück."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["DEVICE_DB_PATH"] = os.path.join(tmp, "device_management_db.json")
+        env["DEVICE_DB_SQLITE_PATH"] = os.path.join(tmp, "device_management_db.sqlite")
+        shutil.copyfile(dataset_path, env["DEVICE_DB_PATH"])
+        if env.get("DEVICE_DB_ENGINE") == "sqlite":
+            subprocess.run([sys.executable, "sqlite_engine.py", env["DEVICE_DB_PATH"], env["DEVICE_DB_SQLITE_PATH"]],
+                           cwd=ROOT, env=env, check=True, capture_output=True)
+
+        samples = {}
+        for _ in range(repeat + 1):
+            for code in (IMPORT_MODELS, RENDER):
+                for name, seconds in _child(code, env).items():
+                    samples.setdefault(name, []).append(seconds)
+        results = {}
+        for name, (cold, *warm) in samples.items():
+            results[name] = {
+                "cold": cold,
+                "warm_median": statistics.median(warm) if warm else None,
+                "warm_min": min(warm) if warm else None,
+                "repeat": repeat,
+            }
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--reservations", type=int, action="append",
+                        help="Datensatzgröße, mehrfach angeben zum Vergleich (Standard: 1000 und 100000)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="Ergebnisse als JSON in diese Datei schreiben")
+    parser.add_argument("--compare", help="mit einer früheren Ergebnisdatei vergleichen")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="Faktor, ab dem eine Verlangsamung als Regression gilt")
+    parser.add_argument("--min-delta", type=float, default=0.02,
+                        help="kleinere Unterschiede (Sekunden) gelten als Messrauschen")
+    args = parser.parse_args()
+
+    results, datasets = {}, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for reservations in args.reservations or [1000, 100_000]:
+            dataset = os.path.join(tmp, f"dataset_{reservations}.json")
+            datasets[reservations] = generate_dataset(dataset, args.users, args.devices, reservations)
+            for name, result in run(dataset, args.repeat).items():
+                key = f"{name}@{reservations}"
+                results[key] = result
+                print(f"{key:35s} cold {result['cold']:.4f}s  warm {result['warm_median']:.4f}s", file=sys.stderr)
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "engine": os.environ.get("DEVICE_DB_ENGINE", "tinydb"),
+            "storage": os.environ.get("DEVICE_DB_STORAGE", "json"),
+            "datasets": datasets,
+        },
+        "results": results,
+    }
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(result, json.load(f), args.threshold, args.min_delta)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
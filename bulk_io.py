@@ -0,0 +1,263 @@
+"""Massenimport und -export von Nutzern, Geräten und Reservierungen als CSV oder JSONL.
+
+Aufruf aus dem Projektverzeichnis:
+    python bulk_io.py import users nutzer.csv
+    python bulk_io.py import devices geraete.jsonl --maintenance rule
+    python bulk_io.py export reservations reservierungen.csv
+
+Das Format ergibt sich aus der Dateiendung (`.csv`, `.jsonl`) oder `--format`.
+Importiert wird in Stapeln (`--batch-size`) mit je einem Schreibvorgang; ungültige
+Zeilen werden übersprungen und gemeldet, mit `--strict` bricht der Import ab.
+Der Export schreibt Zeile für Zeile, ohne die Tabelle als Liste aufzubauen.
+"""
+import argparse
+import csv
+import json
+import sys
+from itertools import islice
+from models import Device, MaintenanceJobs, User
+from recurrence import to_date
+
+FIELDS = {
+    "users": ("id", "name"),
+    "devices": ("device_name", "managed_by_user_id", "end_of_life", "maintenance_interval", "first_maintenance"),
+    "reservations": ("device_name", "reserver", "start_date", "end_date"),
+}
+
+
+class ImportValidationError(ValueError):
+    """Eine Zeile der Importdatei ist ungültig."""
+
+
+def _format_of(path, fmt=None):
+    fmt = fmt or path.rsplit(".", 1)[-1].lower()
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unbekanntes Format: {fmt} (erwartet csv oder jsonl)")
+    return fmt
+
+
+def read_rows(path, fmt=None):
+    """Erzeugt `(zeilennummer, zeile)` aus einer CSV- oder JSONL-Datei, ohne sie ganz einzulesen."""
+    fmt = _format_of(path, fmt)
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        row = ImportValidationError(f"kein gültiges JSON ({e})")
+                    if not isinstance(row, (dict, ImportValidationError)):
+                        row = ImportValidationError("kein JSON-Objekt")
+                    yield line_number, row
+
+
+def write_rows(path, rows, fields, fmt=None):
+    """Schreibt die Zeilen nacheinander als CSV oder JSONL und gibt ihre Anzahl zurück."""
+    fmt = _format_of(path, fmt)
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps({field: row.get(field) for field in fields}, default=str) + "\n")
+                count += 1
+    return count
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _required(row, field):
+    value = row.get(field)
+    if value is None or str(value).strip() == "":
+        raise ImportValidationError(f"Feld '{field}' fehlt")
+    return str(value).strip()
+
+
+def _date(row, field):
+    try:
+        return str(to_date(_required(row, field)))
+    except ValueError:
+        raise ImportValidationError(f"Feld '{field}' ist kein Datum: {row.get(field)!r}") from None
+
+
+def validate_user(row, seen):
+    user_id = _required(row, "id")
+    if user_id in seen or User.find_by_id(user_id) is not None:
+        raise ImportValidationError(f"Nutzer {user_id} existiert bereits")
+    return User(id=user_id, name=_required(row, "name"))
+
+
+def validate_device(row, seen, known_users):
+    device_name = _required(row, "device_name")
+    if device_name in seen or Device.find_by_attribute("device_name", device_name) is not None:
+        raise ImportValidationError(f"Gerät {device_name} existiert bereits")
+    user_id = _required(row, "managed_by_user_id")
+    if user_id not in known_users:
+        if User.find_by_id(user_id) is None:
+            raise ImportValidationError(f"Unbekannter verantwortlicher Nutzer {user_id}")
+        known_users.add(user_id)
+    try:
+        interval = int(_required(row, "maintenance_interval"))
+    except ValueError:
+        raise ImportValidationError(f"Wartungsintervall ist keine Zahl: {row.get('maintenance_interval')!r}") from None
+    if interval < 1:
+        raise ImportValidationError("Wartungsintervall muss mindestens 1 Tag sein")
+    first_maintenance, end_of_life = _date(row, "first_maintenance"), _date(row, "end_of_life")
+    if end_of_life < first_maintenance:
+        raise ImportValidationError("End-of-Life liegt vor der ersten Wartung")
+    return Device(device_name=device_name, managed_by_user_id=user_id, end_of_life=end_of_life,
+                  maintenance_interval=interval, first_maintenance=first_maintenance)
+
+
+def validate_reservation(row, known_devices):
+    device_name = _required(row, "device_name")
+    if device_name not in known_devices:
+        if Device.find_by_attribute("device_name", device_name) is None:
+            raise ImportValidationError(f"Unbekanntes Gerät {device_name}")
+        known_devices.add(device_name)
+    start_date, end_date = _date(row, "start_date"), _date(row, "end_date")
+    if end_date < start_date:
+        raise ImportValidationError("Reservierungsende liegt vor dem Beginn")
+    return device_name, _required(row, "reserver"), start_date, end_date
+
+
+def _validated(rows, validate, rejected, strict):
+    """Gibt die gültigen Objekte weiter und sammelt die Fehler als `(zeilennummer, meldung)`."""
+    for line_number, row in rows:
+        try:
+            if isinstance(row, Exception):
+                raise row
+            yield line_number, validate(row)
+        except ImportValidationError as e:
+            if strict:
+                raise ImportValidationError(f"Zeile {line_number}: {e}") from None
+            rejected.append((line_number, str(e)))
+
+
+def import_file(table, path, fmt=None, batch_size=1000, strict=False, maintenance="none"):
+    """Importiert die Datei in `table` und gibt Anzahl und abgelehnte Zeilen zurück.
+
+    `maintenance` (nur für Geräte): `rule` speichert je Gerät die Wartungsregel,
+    `series` trägt alle Wartungstermine als Reservierungen ein, `queue` überlässt das
+    Anlegen der Regeln dem Hintergrund-Worker (maintenance_worker.py), `none` nichts davon.
+    """
+    rejected = []
+    imported = 0
+    rows = read_rows(path, fmt)
+    if table == "users":
+        seen = set()
+
+        def validate(row):
+            user = validate_user(row, seen)
+            seen.add(user.id)
+            return user
+
+        for batch in _batches(_validated(rows, validate, rejected, strict), batch_size):
+            User.store_many(user for _, user in batch)
+            imported += len(batch)
+    elif table == "devices":
+        seen, known_users = set(), set()
+
+        def validate(row):
+            device = validate_device(row, seen, known_users)
+            seen.add(device.device_name)
+            return device
+
+        for batch in _batches(_validated(rows, validate, rejected, strict), batch_size):
+            devices = [device for _, device in batch]
+            Device.store_many(devices, maintenance_rules=maintenance == "rule")
+            if maintenance == "queue":
+                MaintenanceJobs.enqueue(device.device_name for device in devices)
+            elif maintenance == "series":
+                series = [(line_number, (device.device_name, "Maintenance", day, day))
+                          for line_number, device in batch for day in device.maintenance_dates()]
+                conflicts = Device.add_many_reservations(reservation for _, reservation in series)
+                # Abgelehnte Termine werden der Zeile ihres Geräts zugeordnet
+                pending = iter(conflicts)
+                conflict = next(pending, None)
+                for line_number, reservation in series:
+                    if conflict is not None and reservation is conflict[0]:
+                        if strict:
+                            raise ImportValidationError(f"Zeile {line_number}: {conflict[1]}")
+                        rejected.append((line_number, conflict[1]))
+                        conflict = next(pending, None)
+            imported += len(batch)
+    elif table == "reservations":
+        known_devices = set()
+        for batch in _batches(_validated(rows, lambda row: validate_reservation(row, known_devices),
+                                         rejected, strict), batch_size):
+            conflicts = Device.add_many_reservations(reservation for _, reservation in batch)
+            # Abgelehnte Einträge kommen in derselben Reihenfolge (und als dieselben Objekte) zurück
+            pending = iter(conflicts)
+            conflict = next(pending, None)
+            for line_number, reservation in batch:
+                if conflict is not None and reservation is conflict[0]:
+                    if strict:
+                        raise ImportValidationError(f"Zeile {line_number}: {conflict[1]}")
+                    rejected.append((line_number, conflict[1]))
+                    conflict = next(pending, None)
+            imported += len(batch) - len(conflicts)
+    else:
+        raise ValueError(f"Unbekannte Tabelle: {table}")
+    return {"imported": imported, "rejected": rejected}
+
+
+def export_rows(table, include_maintenance=False, include_archived=False):
+    """Erzeugt die Zeilen von `table` als Dictionaries, eine nach der anderen."""
+    if table == "users":
+        return (user.to_dict() for user in User.iter_all())
+    if table == "devices":
+        return (device.to_dict() for device in Device.iter_all())
+    if table == "reservations":
+        return Device.iter_reservations(include_maintenance=include_maintenance, include_archived=include_archived)
+    raise ValueError(f"Unbekannte Tabelle: {table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("table", choices=tuple(FIELDS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="statt der Dateiendung")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Zeilen je Schreibvorgang")
+    parser.add_argument("--strict", action="store_true", help="beim ersten ungültigen Eintrag abbrechen")
+    parser.add_argument("--maintenance", choices=("none", "rule", "series", "queue"), default="none",
+                        help="Geräteimport: Wartungsregel oder alle Wartungstermine anlegen bzw. einplanen")
+    parser.add_argument("--include-maintenance", action="store_true",
+                        help="Reservierungsexport: Termine aus Wartungsregeln mit ausgeben")
+    parser.add_argument("--include-archived", action="store_true",
+                        help="Reservierungsexport: archivierte Monate mit ausgeben (DEVICE_DB_STORAGE=partitioned)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        rows = export_rows(args.table, args.include_maintenance, args.include_archived)
+        count = write_rows(args.path, rows, FIELDS[args.table], args.format)
+        print(f"{count} Zeilen exportiert")
+        return
+    try:
+        result = import_file(args.table, args.path, args.format, args.batch_size, args.strict, args.maintenance)
+    except ImportValidationError as e:
+        sys.exit(f"Import abgebrochen: {e}")
+    for line_number, message in result["rejected"]:
+        print(f"Zeile {line_number}: {message}", file=sys.stderr)
+    print(f"{result['imported']} Zeilen importiert, {len(result['rejected'])} abgelehnt")
+    if result["rejected"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
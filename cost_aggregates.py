@@ -0,0 +1,130 @@
+from datetime import date, timedelta
+import database
+from recurrence import MaintenanceRule
+
+# Beispielkosten je Wartung, falls ein Gerät keine eigenen `maintenance_cost` hat
+MAINTENANCE_COST = 100
+
+
+def _months(year):
+    """Erster und letzter Tag jedes Monats von `year`."""
+    starts = [date(year, month, 1) for month in range(1, 13)] + [date(year + 1, 1, 1)]
+    return [(starts[i], starts[i + 1] - timedelta(days=1)) for i in range(12)]
+
+
+class MaintenanceCosts:
+    """Materialisierte Wartungskosten der Geräte: Jahressumme, je Verantwortlichem und je Monat.
+
+    Die Jahreskosten eines Geräts sind `365 / maintenance_interval` Wartungen zu je
+    `maintenance_cost` (bzw. `MAINTENANCE_COST`); die Monatswerte zählen die
+    tatsächlich im jeweiligen Monat des laufenden Jahres fälligen Termine.
+    Die Summen werden beim ersten Zugriff aus `load()` (liefert die Geräte-Dokumente)
+    vektorisiert aufgebaut und danach über `add` / `discard` mitgeführt, Lesezugriffe
+    kosten unabhängig von der Anzahl der Geräte O(1).
+    """
+
+    def __init__(self, load, user_field='managed_by_user_id', cost=MAINTENANCE_COST):
+        self.load = load
+        self.user_field = user_field
+        self.cost = cost
+        self._year = None
+        self._total = 0.0
+        self._next_total = 0.0
+        self._by_user = {}
+        self._devices_by_user = {}
+        self._by_month = None
+
+    def _cost_of(self, doc):
+        cost = doc.get('maintenance_cost')
+        return float(self.cost if cost is None else cost)
+
+    def _contribution(self, doc):
+        """Jahreskosten, Kosten je Wartung und Kosten je Monat eines einzelnen Geräts."""
+        cost = self._cost_of(doc)
+        interval = int(doc.get('maintenance_interval') or 0)
+        if interval < 1:
+            return 0.0, cost, [0.0] * 12
+        rule = MaintenanceRule(doc['first_maintenance'], interval, doc['end_of_life'])
+        return 365 / interval * cost, cost, [rule.count(start, end) * cost for start, end in _months(self._year)]
+
+    def _aggregates(self):
+        database.refresh()
+        if self._by_month is None or self._year != date.today().year:
+            self.rebuild()
+        return self
+
+    def rebuild(self):
+        """Berechnet alle Summen neu, vektorisiert über alle Geräte."""
+        import numpy as np
+        from maintenance_schedule import MaintenanceSchedule, to_days
+        docs = [doc for doc in self.load() if 'first_maintenance' in doc]
+        year = date.today().year
+        interval = np.array([int(doc.get('maintenance_interval') or 0) for doc in docs], dtype=np.int64)
+        cost = np.array([self._cost_of(doc) for doc in docs], dtype=float)
+        yearly = np.divide(365 * cost, interval, out=np.zeros(len(docs)), where=interval >= 1)
+        users, user_index = np.unique(np.array([str(doc.get(self.user_field)) for doc in docs], dtype=object),
+                                      return_inverse=True)
+        schedule = MaintenanceSchedule(
+            range(len(docs)),
+            to_days(doc['first_maintenance'] for doc in docs),
+            interval,
+            to_days(doc['end_of_life'] for doc in docs),
+        )
+        by_month = [float(schedule.occurrence_counts(start, end) @ cost) for start, end in _months(year)]
+
+        # Originalwerte (nicht die String-Form) als Schlüssel, wie sie auch `add` verwendet
+        keys = {}
+        for doc, index in zip(docs, user_index):
+            keys.setdefault(int(index), doc.get(self.user_field))
+        self._by_user = {keys[i]: float(total) for i, total in enumerate(np.bincount(user_index, weights=yearly,
+                                                                                     minlength=len(users)))}
+        self._devices_by_user = {keys[i]: int(n) for i, n in enumerate(np.bincount(user_index, minlength=len(users)))}
+        self._total = float(yearly.sum())
+        self._next_total = float(cost.sum())
+        self._year = year
+        self._by_month = by_month
+
+    def invalidate(self):
+        """Verwirft die Summen, sie werden beim nächsten Zugriff neu aufgebaut."""
+        self._by_month = None
+
+    def add(self, doc):
+        # Noch nicht aufgebaut: der Aufbau liest das neue Gerät ohnehin aus der Tabelle
+        if self._by_month is not None:
+            self._apply(doc, 1)
+
+    def discard(self, doc):
+        if self._by_month is not None:
+            self._apply(doc, -1)
+
+    def _apply(self, doc, sign):
+        yearly, cost, months = self._contribution(doc)
+        user = doc.get(self.user_field)
+        self._total += sign * yearly
+        self._next_total += sign * cost
+        self._by_month = [total + sign * month for total, month in zip(self._by_month, months)]
+        self._devices_by_user[user] = self._devices_by_user.get(user, 0) + sign
+        if self._devices_by_user[user] <= 0:
+            # Kein Gerät mehr: Eintrag entfernen statt Rundungsreste stehen zu lassen
+            del self._devices_by_user[user]
+            self._by_user.pop(user, None)
+        else:
+            self._by_user[user] = self._by_user.get(user, 0.0) + sign * yearly
+        if not self._devices_by_user:
+            self._total, self._next_total, self._by_month = 0.0, 0.0, [0.0] * 12
+
+    def total(self):
+        """Wartungskosten aller Geräte pro Jahr."""
+        return self._aggregates()._total
+
+    def next_maintenance_total(self):
+        """Summe der Kosten je einer Wartung aller Geräte."""
+        return self._aggregates()._next_total
+
+    def by_user(self):
+        """Jahreskosten je Verantwortlichem (`user_field -> Kosten`); nicht verändern."""
+        return self._aggregates()._by_user
+
+    def by_month(self):
+        """Kosten der im Monat fälligen Wartungen für Januar bis Dezember des laufenden Jahres."""
+        return list(self._aggregates()._by_month)
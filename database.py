@@ -0,0 +1,352 @@
+import json
+import os
+import threading
+from tinydb import TinyDB
+from tinydb.storages import JSONStorage
+from tinydb.table import Table
+from json_tables import dump_tables, read_table as read_table_lines
+import instrumentation
+
+try:
+    import fcntl
+except ImportError:  # z.B. Windows: nur Sperre innerhalb des Prozesses
+    fcntl = None
+
+# Gemeinsame Datenbank für alle Module (Nutzer, Geräte, Reservierungen, Wartungsregeln)
+DB_PATH = os.environ.get('DEVICE_DB_PATH', 'device_management_db.json')
+# Storage-Backend: "json" (eine Datei), "journal" (Snapshot + Änderungsjournal),
+# "fast" (orjson mit verzögerter Dekodierung der Datumsfelder) oder "partitioned"
+# (eine Datei je Tabelle, Reservierungen nach Monaten, siehe partitioned_storage.py)
+DB_STORAGE = os.environ.get('DEVICE_DB_STORAGE', 'json')
+# Datenbank-Engine für die Modelle: "tinydb" oder "sqlite" (siehe models.py)
+DB_ENGINE = os.environ.get('DEVICE_DB_ENGINE', 'tinydb')
+SQLITE_PATH = os.environ.get('DEVICE_DB_SQLITE_PATH', 'device_management_db.sqlite')
+
+_db = None
+_listeners = []
+
+
+class CachedJSONStorage(JSONStorage):
+    """JSONStorage mit Lesecache.
+
+    Die Datei wird nur neu eingelesen, wenn sich Änderungszeit oder Größe geändert
+    haben, also wenn ein anderer Prozess geschrieben hat. Eigene Schreibvorgänge
+    aktualisieren den Cache direkt. Geschrieben wird eine Tabelle je Zeile (siehe
+    json_tables.py), sodass `read_table` einzelne Tabellen lesen kann, ohne die
+    ganze Datei zu parsen.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self.on_reload = None
+        self._cache = None
+        self._tables = {}
+        self._stamp = None
+
+    def _file_stamp(self):
+        stat = os.fstat(self._handle.fileno())
+        return stat.st_mtime_ns, stat.st_size
+
+    def _check_stamp(self):
+        """Verwirft die Caches, wenn ein anderer Prozess die Datei geändert hat, und meldet das."""
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            reloaded = self._stamp is not None
+            self._cache, self._tables, self._stamp = None, {}, stamp
+            if reloaded and self.on_reload:
+                self.on_reload()
+
+    def read(self):
+        self._check_stamp()
+        if self._cache is None:
+            self._cache = super().read()
+        return self._cache
+
+    def read_table(self, name):
+        """Die Dokumente der Tabelle `name` (nicht verändern); die übrigen Tabellen werden nicht geparst."""
+        self._check_stamp()
+        if self._cache is not None:
+            return self._cache.get(name)
+        if name not in self._tables:
+            self._handle.seek(0)
+            found, table = read_table_lines(self._handle.readline, name, json.dumps, json.loads)
+            if not found:
+                return (self.read() or {}).get(name)
+            self._tables[name] = table
+        return self._tables[name]
+
+    def refresh(self):
+        """Prüft, ob die Datei von außen geändert wurde; neu gelesen wird erst beim nächsten Zugriff."""
+        self._check_stamp()
+
+    def invalidate(self):
+        """Verwirft den Lesecache, die Datei wird beim nächsten Zugriff neu gelesen."""
+        self._cache = None
+        self._tables = {}
+
+    def write(self, data):
+        try:
+            if self.kwargs:
+                # Eigene Formatierung (z.B. `indent`): wie JSONStorage in einem Stück
+                super().write(data)
+            else:
+                self._handle.seek(0)
+                self._handle.write(dump_tables(data, json.dumps))
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+                self._handle.truncate()
+        except Exception:
+            self._cache = None
+            raise
+        self._cache = data
+        self._tables = {}
+        self._stamp = self._file_stamp()
+
+
+class FileLock:
+    """Sperre über Prozessgrenzen hinweg (`flock` auf `DB_PATH + '.lock'`), im Prozess wiedereintrittsfähig.
+
+    Oberfläche und Wartungs-Worker öffnen dieselbe Datenbankdatei; die Sperre verhindert,
+    dass ein Prozess eine halb geschriebene Datei liest oder Änderungen des anderen überschreibt.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        self._depth += 1
+        if self._depth == 1 and fcntl is not None:
+            if self._handle is None:
+                self._handle = open(DB_PATH + '.lock', 'a')
+            fcntl.flock(self._handle, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_UN)
+        self._lock.release()
+
+
+lock = FileLock()
+
+
+def _locked(func):
+    def wrapper(*args, **kwargs):
+        with lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _lock_storage(storage):
+    """Führt Lesen, Schreiben und Auffrischen des Storage-Objekts (auch einer Middleware) unter `lock` aus."""
+    storage.read, storage.write = _locked(storage.read), _locked(storage.write)
+    if hasattr(storage, 'refresh'):
+        storage.refresh = _locked(storage.refresh)
+    # Nur wenn die Klasse selbst es kann (eine Middleware würde sonst an ihrem Storage vorbei lesen)
+    for name in ('read_table', 'read_range', 'read_archived', 'remove_archived', 'archive', 'id_floor'):
+        if hasattr(type(storage), name):
+            setattr(storage, name, _locked(getattr(storage, name)))
+
+
+class LockedTable(Table):
+    """TinyDB-Tabelle, deren Schreibvorgänge (Lesen, Ändern, Schreiben) als Ganzes unter `lock` laufen."""
+
+    def _update_table(self, updater):
+        with lock:
+            return super()._update_table(updater)
+
+    def _refresh(self):
+        # Vor der Vergabe der nächsten doc_id Einfügungen anderer Prozesse übernehmen
+        refresh = getattr(self._storage, 'refresh', None)
+        if refresh:
+            refresh()
+
+    def _get_next_id(self):
+        next_id = super()._get_next_id()
+        # Archivierte Dokumente behalten ihre doc_ids, auch wenn sie nicht mehr gelesen werden
+        if hasattr(type(self._storage), 'id_floor'):
+            floor = self._storage.id_floor(self.name)
+            if next_id <= floor:
+                next_id = floor + 1
+                self._next_id = next_id + 1
+        return next_id
+
+    def insert(self, document):
+        with lock:
+            self._refresh()
+            return super().insert(document)
+
+    def insert_multiple(self, documents):
+        with lock:
+            self._refresh()
+            return super().insert_multiple(documents)
+
+
+class InstrumentedLockedTable(instrumentation.InstrumentedTable, LockedTable):
+    """`LockedTable` mit den Zählern von `instrumentation.InstrumentedTable` (bei DEVICE_PERF)."""
+
+
+def _reset_next_ids():
+    for table in _db._tables.values():
+        table._next_id = None
+
+
+def get_db():
+    """Gibt die gemeinsame TinyDB-Instanz zurück und öffnet sie beim ersten Aufruf."""
+    global _db
+    if _db is None:
+        # Nur das Modul des gewählten Backends wird importiert
+        if DB_STORAGE == 'json':
+            storage_class = CachedJSONStorage
+        elif DB_STORAGE == 'journal':
+            from journal_storage import JournalStorage as storage_class
+        elif DB_STORAGE == 'fast':
+            from fast_serializer import FastSerializationMiddleware
+            storage_class = FastSerializationMiddleware()
+        elif DB_STORAGE == 'partitioned':
+            from partitioned_storage import PartitionedStorage as storage_class
+        else:
+            raise ValueError(f"Unbekanntes Storage-Backend: {DB_STORAGE}")
+        _db = TinyDB(DB_PATH, storage=storage_class)
+        # Bei einer Middleware gehört der Hook an den eigentlichen Storage
+        storage = _db.storage
+        getattr(storage, 'storage', storage).on_reload = _notify_listeners
+        _lock_storage(storage)
+        _db.table_class = LockedTable
+        # Andere Prozesse können inzwischen doc_ids vergeben haben
+        on_external_change(_reset_next_ids)
+        if instrumentation.ENABLED:
+            instrumentation.instrument_storage(storage)
+            _db.table_class = InstrumentedLockedTable
+    return _db
+
+
+class LazyTable:
+    """Tabelle der gemeinsamen Datenbank, die erst beim ersten Zugriff geöffnet wird.
+
+    Die Modelle legen ihre Tabellen beim Import an; geöffnet (und je nach Storage
+    gelesen) wird die Datenbank so erst, wenn eine Tabelle tatsächlich benutzt wird.
+    Attribute und Methoden werden an die TinyDB-Tabelle weitergereicht.
+    """
+
+    __slots__ = ('name', '_table')
+
+    def __init__(self, name):
+        self.name = name
+        self._table = None
+
+    def _resolve(self):
+        if self._table is None:
+            self._table = get_db().table(self.name, cache_size=0)
+        return self._table
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __iter__(self):
+        return iter(self._resolve())
+
+    def __len__(self):
+        return len(self._resolve())
+
+    def __repr__(self):
+        return f"<LazyTable {self.name!r}>"
+
+
+def table(name):
+    """Gibt eine Tabelle der gemeinsamen Datenbank zurück (geöffnet wird sie beim ersten Zugriff).
+
+    Der Abfrage-Cache von TinyDB ist abgeschaltet, da er Änderungen anderer
+    Prozesse nicht bemerkt; das Lesen ist durch den Storage-Cache günstig.
+    """
+    return LazyTable(name)
+
+
+def read_table(name):
+    """Die Dokumente der Tabelle `name` als `{doc_id: dokument}` (nicht verändern).
+
+    Kann der Storage einzelne Tabellen lesen, werden die übrigen Tabellen nicht geparst.
+    """
+    storage = get_db().storage
+    if hasattr(type(storage), 'read_table'):
+        return storage.read_table(name) or {}
+    return (storage.read() or {}).get(name) or {}
+
+
+def project(name, fields):
+    """Nur die Felder `fields` aller Dokumente der Tabelle `name`, als Tupel in Speicherreihenfolge."""
+    return [tuple(doc.get(field) for field in fields) for doc in read_table(name).values()]
+
+
+def read_range(name, start_date=None, end_date=None):
+    """Die Dokumente von `name`, die [start_date, end_date] überlappen können, als `{doc_id: dokument}` (nicht verändern).
+
+    Nur der partitionierte Storage liest dafür gezielt einzelne Monate; sonst ist das
+    Ergebnis `None` und die ganze Tabelle zu lesen.
+    """
+    storage = get_db().storage
+    if not hasattr(type(storage), 'read_range'):
+        return None
+    return storage.read_range(name, start_date, end_date)
+
+
+def read_archived(name, start_date=None, end_date=None):
+    """Archivierte Dokumente von `name` aus den Monaten, die [start_date, end_date] überlappen können.
+
+    Nur der partitionierte Storage hat ein Archiv; bei den übrigen ist das Ergebnis leer.
+    """
+    storage = get_db().storage
+    if not hasattr(type(storage), 'read_archived'):
+        return []
+    return storage.read_archived(name, start_date, end_date)
+
+
+def remove_archived(name, field, values):
+    """Entfernt archivierte Dokumente von `name`, deren `field` in `values` liegt; gibt ihre Anzahl zurück.
+
+    Ohne Archiv (alle Storages außer dem partitionierten) ist nichts zu tun.
+    """
+    storage = get_db().storage
+    if not hasattr(type(storage), 'remove_archived'):
+        return 0
+    return storage.remove_archived(name, field, values)
+
+
+def archive(before):
+    """Archiviert alle Reservierungsmonate, die vor `before` enden (siehe `PartitionedStorage.archive`)."""
+    storage = get_db().storage
+    if not hasattr(type(storage), 'archive'):
+        raise ValueError("Archivieren erfordert DEVICE_DB_STORAGE=partitioned")
+    archived = storage.archive(before)
+    if archived:
+        # Die archivierten Reservierungen fehlen jetzt im Arbeitsbestand
+        _notify_listeners()
+    return archived
+
+
+def refresh():
+    """Prüft, ob die Datei von außen geändert wurde, und benachrichtigt dann alle Listener."""
+    get_db().storage.refresh()
+
+
+def invalidate():
+    """Verwirft alle Caches (Storage, Indizes, Modell-Cache), z.B. für Messungen mit kaltem Cache."""
+    storage = get_db().storage
+    storage = getattr(storage, 'storage', storage)
+    if hasattr(storage, 'invalidate'):
+        storage.invalidate()
+    _notify_listeners()
+
+
+def _notify_listeners():
+    for callback in _listeners:
+        callback()
+
+
+def on_external_change(callback):
+    """Registriert eine Funktion, die aufgerufen wird, wenn die Datei von außen geändert wurde."""
+    _listeners.append(callback)
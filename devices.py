@@ -1,12 +1,119 @@
-from tinydb import TinyDB, Query
-from datetime import datetime
+import heapq
+from datetime import date, timedelta
+from itertools import islice
+from tinydb import Query
+import database
+from model_cache import bump, cached
+from recurrence import MaintenanceRule, to_date
+from interval_index import IntervalIndex
+from indexes import HashIndex
+from cost_aggregates import MaintenanceCosts
+
+# Tabellen der gemeinsamen Datenbank
+devices_table = database.table('devices')
+reservations_table = database.table('reservations')
+maintenance_rules_table = database.table('maintenance_rules')
+
+# Primärschlüssel-Indizes (Schlüssel -> doc_ids)
+devices_by_name = HashIndex(devices_table, 'device_name')
+reservations_by_key = HashIndex(reservations_table, ('device_name', 'start_date'))
+maintenance_rules_by_device = HashIndex(maintenance_rules_table, 'device_name')
+
+# Rückwärts-Indizes der Fremdschlüssel (Nutzer -> verwaltete Geräte, Gerät -> Reservierungen)
+devices_by_user = HashIndex(devices_table, 'managed_by_user_id')
+reservations_by_device = HashIndex(reservations_table, 'device_name')
+
+# Materialisierte Wartungskosten, werden von `store_data` und `delete` mitgeführt
+maintenance_costs = MaintenanceCosts(lambda: devices_table.all())
+
+# Intervall-Index je Gerät (device_name -> IntervalIndex), wird beim ersten Zugriff aufgebaut
+_interval_indexes = None
+
+
+class ReservationConflictError(ValueError):
+    """Die Reservierung überschneidet sich mit einer bestehenden Reservierung oder Wartung."""
+
+
+def _reservation_index(device_name):
+    """Gibt den Intervall-Index eines Geräts zurück und baut alle Indizes bei Bedarf einmalig auf."""
+    global _interval_indexes
+    database.refresh()
+    if _interval_indexes is None:
+        indexes = {}
+        for r in reservations_table.all():
+            if 'device_name' in r:
+                indexes.setdefault(r['device_name'], IntervalIndex()).add(
+                    to_date(r['start_date']).toordinal(), to_date(r['end_date']).toordinal(), r['reserver'])
+        _interval_indexes = indexes
+    return _interval_indexes.setdefault(device_name, IntervalIndex())
+
+
+def _invalidate_indexes():
+    """Verwirft alle In-Memory-Indizes, z.B. nachdem ein anderer Prozess geschrieben hat."""
+    global _interval_indexes
+    _interval_indexes = None
+    for index in (devices_by_name, reservations_by_key, maintenance_rules_by_device,
+                  devices_by_user, reservations_by_device, maintenance_costs):
+        index.invalidate()
+
+
+database.on_external_change(_invalidate_indexes)
+
+def _reservation_sort_key(reservation):
+    """Sortierung und Cursor für Reservierungsseiten: (Startdatum, Gerät, Reservierer)."""
+    return reservation['start_date'], reservation.get('device_name') or "", reservation.get('reserver') or ""
+
+
+def _maintenance_reservations(device_name, rule, start_date=None, end_date=None):
+    """Erzeugt die Wartungstermine einer Regel im Fenster als Reservierungen."""
+    for d in rule.occurrences(start_date, end_date):
+        yield {"device_name": device_name, "reserver": "Maintenance", "start_date": str(d), "end_date": str(d)}
+
+
+def _planned_rule(stored, device):
+    """Die Wartungsregel für Konfliktprüfungen: immer bis End-of-Life des Geräts.
+
+    Die gespeicherte Regel reicht nur bis zum Planungshorizont bzw. fehlt noch, bis der
+    Worker sie anlegt; ihre abgesagten Termine gelten aber weiter.
+    """
+    if device is None or not device.get('first_maintenance'):
+        return stored
+    full = Device(**{field: device[field] for field in Device.__slots__}).maintenance_rule()
+    if stored is None:
+        return full
+    return MaintenanceRule(stored.start, stored.interval, max(stored.end, full.end), stored.exceptions)
+
+
+def _blocking_maintenance(rule, start, end, reserver=None):
+    """Erster Termin der Regel in [start, end], der eine Reservierung von `reserver` verhindert, sonst `None`.
+
+    Eine Wartung ("Maintenance") an einem Termin der eigenen Regel ist dieser Termin
+    selbst, z.B. wenn die Serie als einzelne Reservierungen gespeichert wird.
+    """
+    if rule is None:
+        return None
+    if reserver == "Maintenance" and start == end and rule.occurs_on(start):
+        return None
+    return next(rule.occurrences(start, end), None)
+
+
+def _maintenance_collisions(device_name, rule, window_start, reservations):
+    """Termine der Regel ab `window_start`, die in eine der `reservations` (start, end, reserver) fallen.
+
+    Gespeicherte Wartungen gelten als bereits erledigte Termine, nicht als Kollision.
+    """
+    collisions = []
+    for start, end, reserver in reservations:
+        if reserver == "Maintenance":
+            continue
+        for day in rule.occurrences(max(to_date(start), window_start), end):
+            collisions.append({"device_name": device_name, "date": str(day), "reserver": reserver})
+    return collisions
 
-# Datenbank initialisieren
-db = TinyDB('device_management_db.json')
-devices_table = db.table('devices')
-reservations_table = db.table('reservations')
 
 class Device:
+    __slots__ = ('device_name', 'managed_by_user_id', 'end_of_life', 'maintenance_interval', 'first_maintenance')
+
     def __init__(self, device_name, managed_by_user_id, end_of_life, maintenance_interval, first_maintenance):
         self.device_name = device_name
         self.managed_by_user_id = managed_by_user_id
@@ -14,26 +121,366 @@ class Device:
         self.maintenance_interval = maintenance_interval
         self.first_maintenance = first_maintenance
 
+    def to_dict(self):
+        """Die gespeicherten Felder des Geräts als Dictionary."""
+        return {field: getattr(self, field) for field in Device.__slots__}
+
     def store_data(self):
         """Speichert das Gerät in der Datenbank."""
-        devices_table.insert(self.__dict__)
+        data = self.to_dict()
+        doc_id = devices_table.insert(data)
+        devices_by_name.add(doc_id, data)
+        devices_by_user.add(doc_id, data)
+        maintenance_costs.add(data)
+        bump('devices')
 
     def add_reservation(self, reserver, start_date, end_date):
-        """Fügt eine Reservierung für das Gerät hinzu."""
-        reservations_table.insert({
+        """Fügt eine Reservierung für das Gerät hinzu.
+
+        Überschneidet sie sich mit einer bestehenden Reservierung, wird ein
+        `ReservationConflictError` ausgelöst.
+        """
+        if not self.is_available(self.device_name, start_date, end_date, reserver):
+            raise ReservationConflictError(f"{self.device_name} ist von {start_date} bis {end_date} bereits reserviert.")
+        reservation = {
             "device_name": self.device_name,
             "reserver": reserver,
             "start_date": str(start_date),
             "end_date": str(end_date)
-        })
+        }
+        doc_id = reservations_table.insert(reservation)
+        reservations_by_key.add(doc_id, reservation)
+        reservations_by_device.add(doc_id, reservation)
+        _reservation_index(self.device_name).add(to_date(start_date).toordinal(), to_date(end_date).toordinal(), reserver)
+        bump('reservations')
+
+    def add_reservations(self, reservations):
+        """Fügt mehrere Reservierungen mit einem einzigen Schreibvorgang hinzu.
+
+        `reservations` ist ein beliebiges Iterable (z.B. ein Generator) aus
+        Tupeln `(reserver, start_date, end_date)`.
+        """
+        index = _reservation_index(self.device_name)
+        accepted = []
+        try:
+            for reserver, start_date, end_date in reservations:
+                if not self.is_available(self.device_name, start_date, end_date, reserver):
+                    raise ReservationConflictError(f"{self.device_name} ist von {start_date} bis {end_date} bereits reserviert.")
+                index.add(to_date(start_date).toordinal(), to_date(end_date).toordinal(), reserver)
+                accepted.append({
+                    "device_name": self.device_name,
+                    "reserver": reserver,
+                    "start_date": str(start_date),
+                    "end_date": str(end_date)
+                })
+        except ReservationConflictError:
+            for r in accepted:
+                index.remove_start(to_date(r['start_date']).toordinal())
+            raise
+        for doc_id, reservation in zip(reservations_table.insert_multiple(accepted), accepted):
+            reservations_by_key.add(doc_id, reservation)
+            reservations_by_device.add(doc_id, reservation)
+        bump('reservations')
+
+    @classmethod
+    def store_many(cls, devices, maintenance_rules=False):
+        """Speichert mehrere Geräte mit einem einzigen Schreibvorgang, optional mit ihren Wartungsregeln."""
+        data = [device.to_dict() for device in devices]
+        for doc_id, doc in zip(devices_table.insert_multiple(data), data):
+            devices_by_name.add(doc_id, doc)
+            devices_by_user.add(doc_id, doc)
+            maintenance_costs.add(doc)
+        bump('devices')
+        if maintenance_rules:
+            new_rules = []
+            for doc in data:
+                rule_data = {"device_name": doc['device_name'], **cls(**doc).maintenance_rule().to_dict()}
+                doc_ids = maintenance_rules_by_device.get(doc['device_name'])
+                if doc_ids:
+                    maintenance_rules_table.update(rule_data, doc_ids=doc_ids)
+                else:
+                    new_rules.append(rule_data)
+            for doc_id, rule_data in zip(maintenance_rules_table.insert_multiple(new_rules), new_rules):
+                maintenance_rules_by_device.add(doc_id, rule_data)
+            bump('maintenance_rules')
+
+    @classmethod
+    def add_many_reservations(cls, reservations):
+        """Fügt Reservierungen beliebiger Geräte mit einem einzigen Schreibvorgang hinzu.
+
+        `reservations` ist ein Iterable aus Tupeln `(device_name, reserver, start_date, end_date)`.
+        Überschneidungen (auch untereinander) werden nicht gespeichert, sondern als Liste
+        von `(reservierung, fehlermeldung)` zurückgegeben.
+        """
+        accepted, rejected = [], []
+        for reservation in reservations:
+            device_name, reserver, start_date, end_date = reservation
+            if not cls.is_available(device_name, start_date, end_date, reserver):
+                rejected.append((reservation,
+                                 f"{device_name} ist von {start_date} bis {end_date} bereits reserviert."))
+                continue
+            _reservation_index(device_name).add(to_date(start_date).toordinal(), to_date(end_date).toordinal(), reserver)
+            accepted.append({
+                "device_name": device_name,
+                "reserver": reserver,
+                "start_date": str(start_date),
+                "end_date": str(end_date)
+            })
+        for doc_id, reservation in zip(reservations_table.insert_multiple(accepted), accepted):
+            reservations_by_key.add(doc_id, reservation)
+            reservations_by_device.add(doc_id, reservation)
+        bump('reservations')
+        return rejected
+
+    def maintenance_rule(self, until=None):
+        """Gibt die Wartungsregel (erste Wartung, Intervall, End-of-Life) des Geräts zurück.
+
+        Mit `until` endet die Regel spätestens an diesem Tag (rollierender Planungshorizont).
+        """
+        end = to_date(self.end_of_life)
+        if until is not None:
+            end = min(end, to_date(until))
+        return MaintenanceRule(self.first_maintenance, self.maintenance_interval, end)
+
+    def maintenance_dates(self):
+        """Erzeugt alle Wartungstermine zwischen erster Wartung und End-of-Life."""
+        return self.maintenance_rule().occurrences()
+
+    def store_maintenance_rule(self):
+        """Speichert die Wartung einmalig als Regel statt als einzelne Reservierungen."""
+        rule_data = {"device_name": self.device_name, **self.maintenance_rule().to_dict()}
+        doc_ids = maintenance_rules_by_device.get(self.device_name)
+        if doc_ids:
+            maintenance_rules_table.update(rule_data, doc_ids=doc_ids)
+        else:
+            maintenance_rules_by_device.add(maintenance_rules_table.insert(rule_data), rule_data)
+        bump('maintenance_rules')
+
+    @classmethod
+    def extend_maintenance_rules(cls, devices, until):
+        """Legt die Wartungsregeln der Geräte an bzw. verlängert sie bis `until` (höchstens bis End-of-Life).
+
+        Bestehende Regeln werden nur verlängert, nie gekürzt; abgesagte Termine bleiben
+        erhalten. Fällt ein neu abgedeckter Termin auf eine bestehende Reservierung, wird er
+        als Ausnahme eingetragen statt doppelt zu buchen; diese Kollisionen werden als Liste
+        von `{"device_name", "date", "reserver"}` zurückgegeben. Geschrieben wird einmal für
+        alle neuen Regeln und einmal je neuem Regelende.
+        """
+        new_rules, extended, collisions = [], {}, []
+        for device in devices:
+            rule = device.maintenance_rule(until)
+            doc_ids = maintenance_rules_by_device.get(device.device_name)
+            stored = MaintenanceRule.from_dict(maintenance_rules_table.get(doc_id=doc_ids[0])) if doc_ids else None
+            if stored is not None and stored.end >= rule.end:
+                continue
+            window_start = rule.start if stored is None else max(rule.start, stored.end + timedelta(days=1))
+            if stored is not None:
+                rule.exceptions = set(stored.exceptions)
+            found = _maintenance_collisions(device.device_name, rule, window_start, (
+                (date.fromordinal(s), date.fromordinal(e), reserver)
+                for s, e, reserver in _reservation_index(device.device_name).overlaps(
+                    window_start.toordinal(), rule.end.toordinal())
+            )) if window_start <= rule.end else []
+            rule.exceptions.update(to_date(collision["date"]) for collision in found)
+            collisions += found
+            if stored is None:
+                new_rules.append({"device_name": device.device_name, **rule.to_dict()})
+            elif found:
+                maintenance_rules_table.update({"end": str(rule.end), "exceptions": rule.to_dict()["exceptions"]},
+                                               doc_ids=doc_ids)
+            else:
+                extended.setdefault(str(rule.end), []).extend(doc_ids)
+        for doc_id, rule_data in zip(maintenance_rules_table.insert_multiple(new_rules), new_rules):
+            maintenance_rules_by_device.add(doc_id, rule_data)
+        for end, doc_ids in extended.items():
+            maintenance_rules_table.update({"end": end}, doc_ids=doc_ids)
+        bump('maintenance_rules')
+        return collisions
+
+    @classmethod
+    def devices_behind_horizon(cls, before):
+        """Namen der Geräte, deren Wartungsregel vor `before` endet, obwohl bis dahin Termine anfallen."""
+        before = to_date(before)
+        rules = cls.get_maintenance_rules()
+        names = []
+        for device in cls.find_all():
+            target = device.maintenance_rule(before)
+            if target.interval < 1 or target.end < target.start:
+                continue
+            rule = rules.get(device.device_name)
+            if rule is None or rule.end < target.end:
+                names.append(device.device_name)
+        return names
 
     @classmethod
     def remove_reservation(cls, device_name, start_date):
-        """Entfernt eine Reservierung basierend auf Gerät und Startdatum."""
-        ReservationQuery = Query()
-        reservations_table.remove((ReservationQuery.device_name == device_name) & (ReservationQuery.start_date == start_date))
+        """Entfernt eine Reservierung basierend auf Gerät und Startdatum.
+
+        Liegt an diesem Datum ein Termin der Wartungsregel, wird er als Ausnahme eingetragen.
+        """
+        doc_ids = reservations_by_key.pop((device_name, str(start_date)))
+        if doc_ids:
+            reservations_table.remove(doc_ids=doc_ids)
+            for doc_id in doc_ids:
+                reservations_by_device.discard(doc_id, {"device_name": device_name})
+        _reservation_index(device_name).remove_start(to_date(start_date).toordinal())
+        rule_doc_id = maintenance_rules_by_device.first(device_name)
+        if rule_doc_id is not None:
+            rule = MaintenanceRule.from_dict(maintenance_rules_table.get(doc_id=rule_doc_id))
+            if rule.occurs_on(start_date):
+                rule.exceptions.add(to_date(start_date))
+                maintenance_rules_table.update({"exceptions": rule.to_dict()["exceptions"]}, doc_ids=[rule_doc_id])
+        bump('reservations', 'maintenance_rules')
+
+    @classmethod
+    def delete(cls, device_name):
+        """Entfernt ein Gerät mit seinen Reservierungen und seiner Wartungsregel aus der Datenbank."""
+        cls.delete_many([device_name])
+
+    @classmethod
+    def delete_many(cls, device_names):
+        """Entfernt mehrere Geräte samt Reservierungen und Wartungsregeln, mit einem Schreibvorgang je Tabelle.
+
+        Die betroffenen Einträge werden über die Indizes gefunden, ohne die Tabellen zu durchsuchen.
+        Archivierte Reservierungen der Geräte werden ebenfalls entfernt, sonst tauchten sie im
+        Export auf und ein neu angelegtes Gerät gleichen Namens erbte sie.
+        """
+        device_names = list(device_names)
+        device_doc_ids, reservation_doc_ids, rule_doc_ids = [], [], []
+        for device_name in device_names:
+            device_doc_ids += devices_by_name.pop(device_name)
+            reservation_doc_ids += reservations_by_device.pop(device_name)
+            rule_doc_ids += maintenance_rules_by_device.pop(device_name)
+        if device_doc_ids:
+            for doc in devices_table.get(doc_ids=device_doc_ids):
+                devices_by_user.discard(doc.doc_id, doc)
+                maintenance_costs.discard(doc)
+            devices_table.remove(doc_ids=device_doc_ids)
+        if reservation_doc_ids:
+            for doc in reservations_table.get(doc_ids=reservation_doc_ids):
+                reservations_by_key.discard(doc.doc_id, doc)
+            reservations_table.remove(doc_ids=reservation_doc_ids)
+        if rule_doc_ids:
+            maintenance_rules_table.remove(doc_ids=rule_doc_ids)
+        database.remove_archived('reservations', 'device_name', device_names)
+        if _interval_indexes is not None:
+            for device_name in device_names:
+                _interval_indexes.pop(device_name, None)
+        bump('devices', 'reservations', 'maintenance_rules')
+
+    @classmethod
+    def find_managed_by(cls, user_id):
+        """Gibt alle Geräte zurück, für die `user_id` verantwortlich ist (über den Rückwärts-Index)."""
+        doc_ids = devices_by_user.get(user_id)
+        if not doc_ids:
+            return []
+        return [cls(**{field: doc[field] for field in Device.__slots__}) for doc in devices_table.get(doc_ids=doc_ids)]
 
     @classmethod
+    def reassign_managed_devices(cls, user_id, new_user_id):
+        """Überträgt alle Geräte von `user_id` mit einem Schreibvorgang an `new_user_id`; gibt ihre Anzahl zurück."""
+        doc_ids = devices_by_user.pop(user_id)
+        if not doc_ids:
+            return 0
+        docs = devices_table.get(doc_ids=doc_ids)
+        devices_table.update({"managed_by_user_id": new_user_id}, doc_ids=doc_ids)
+        for doc in docs:
+            updated = {**doc, "managed_by_user_id": new_user_id}
+            maintenance_costs.discard(doc)
+            maintenance_costs.add(updated)
+            devices_by_user.add(doc.doc_id, updated)
+        bump('devices')
+        return len(doc_ids)
+
+    @classmethod
+    def _maintenance_rule_of(cls, device_name):
+        """Die Wartungsregel des Geräts für Konfliktprüfungen (siehe `_planned_rule`)."""
+        rule_doc_id = maintenance_rules_by_device.first(device_name)
+        device_doc_id = devices_by_name.first(device_name)
+        return _planned_rule(
+            MaintenanceRule.from_dict(maintenance_rules_table.get(doc_id=rule_doc_id)) if rule_doc_id is not None else None,
+            devices_table.get(doc_id=device_doc_id) if device_doc_id is not None else None,
+        )
+
+    @classmethod
+    def find_conflicts(cls, device_name, start_date, end_date):
+        """Gibt alle Reservierungen und Wartungstermine zurück, die [start_date, end_date] überlappen."""
+        start, end = to_date(start_date).toordinal(), to_date(end_date).toordinal()
+        conflicts = [
+            {"device_name": device_name, "reserver": reserver,
+             "start_date": str(date.fromordinal(s)), "end_date": str(date.fromordinal(e))}
+            for s, e, reserver in _reservation_index(device_name).overlaps(start, end)
+        ]
+        rule = cls._maintenance_rule_of(device_name)
+        if rule:
+            occurrence = next(rule.occurrences(date.fromordinal(start), date.fromordinal(end)), None)
+            if occurrence:
+                conflicts.append({"device_name": device_name, "reserver": "Maintenance",
+                                  "start_date": str(occurrence), "end_date": str(occurrence)})
+        return conflicts
+
+    @classmethod
+    def is_available(cls, device_name, start_date, end_date, reserver=None):
+        """Prüft, ob das Gerät im Zeitraum [start_date, end_date] frei ist.
+
+        Mit `reserver="Maintenance"` steht ein Termin der eigenen Wartungsregel nicht im Weg.
+        """
+        start, end = to_date(start_date), to_date(end_date)
+        if _reservation_index(device_name).count_overlaps(start.toordinal(), end.toordinal()):
+            return False
+        return _blocking_maintenance(cls._maintenance_rule_of(device_name), start, end, reserver) is None
+
+    @classmethod
+    def next_free_slot(cls, device_name, duration, after=None):
+        """Gibt das früheste Startdatum ab `after` zurück, an dem das Gerät `duration` Tage frei ist."""
+        days = duration.days if isinstance(duration, timedelta) else int(duration)
+        if days < 1:
+            raise ValueError("Die Dauer muss mindestens einen Tag betragen.")
+        candidate = to_date(after) if after is not None else date.today()
+        rule = cls._maintenance_rule_of(device_name)
+        if rule and not rule.exceptions and rule.interval - 1 < days and rule.start <= candidate <= rule.end:
+            # Zwischen zwei Wartungen passt der Zeitraum nie, erst nach dem letzten Termin
+            last = rule.start + timedelta(days=(rule.end - rule.start).days // rule.interval * rule.interval)
+            candidate = max(candidate, last + timedelta(days=1))
+        while True:
+            end = candidate + timedelta(days=days - 1)
+            conflicts = cls.find_conflicts(device_name, candidate, end)
+            if not conflicts:
+                return candidate
+            candidate = max(to_date(c['end_date']) for c in conflicts) + timedelta(days=1)
+
+    @classmethod
+    def iter_all(cls):
+        """Erzeugt alle Geräte nacheinander, ohne eine Liste aufzubauen."""
+        for device_data in devices_table:
+            yield cls(**{field: device_data[field] for field in Device.__slots__})
+
+    @classmethod
+    def iter_reservations(cls, start_date=None, end_date=None, include_maintenance=False, include_archived=False):
+        """Erzeugt die gespeicherten Reservierungen sortiert nacheinander, optional mit den Wartungsterminen
+        und den archivierten Reservierungen (siehe partitioned_storage.py)."""
+        start = str(to_date(start_date)) if start_date is not None else None
+        if include_maintenance:
+            reservations = cls._iter_reservations(start_date, end_date)
+        else:
+            reservations = (r for r in cls._iter_stored_reservations(start_date, end_date)
+                            if start is None or r['end_date'] >= start)
+        if not include_archived:
+            return reservations
+        return heapq.merge(reservations, cls._archived_reservations(start_date, end_date), key=_reservation_sort_key)
+
+    @classmethod
+    def _archived_reservations(cls, start_date=None, end_date=None):
+        """Archivierte Reservierungen im Zeitraum, sortiert; gelesen werden nur die Monate, die ihn überlappen können."""
+        start = str(to_date(start_date)) if start_date is not None else None
+        end = str(to_date(end_date)) if end_date is not None else None
+        archived = [r for r in database.read_archived('reservations', start, end)
+                    if (start is None or r['end_date'] >= start) and (end is None or r['start_date'] <= end)]
+        archived.sort(key=_reservation_sort_key)
+        return archived
+
+    @classmethod
+    @cached('devices')
     def find_all(cls):
         """Liest alle Geräte aus der Datenbank und gibt sie als Objekte zurück."""
         devices = []
@@ -47,13 +494,31 @@ class Device:
             ))
         return devices
 
+    @classmethod
+    @cached('devices')
+    def project(cls, *fields):
+        """Nur die angegebenen Felder aller Geräte, ohne die übrigen Tabellen und Felder zu laden.
+
+        Mit einem Feld eine Liste der Werte (z.B. `Device.project("device_name")` für
+        Auswahllisten), mit mehreren eine Liste von Tupeln.
+        """
+        unknown = set(fields) - set(Device.__slots__)
+        if not fields or unknown:
+            raise ValueError(f"Unbekannte Felder: {sorted(unknown)}")
+        rows = database.project('devices', fields)
+        return [row[0] for row in rows] if len(fields) == 1 else rows
+
     @classmethod
     def find_by_attribute(cls, attribute, value):
         """Findet ein Gerät basierend auf einem bestimmten Attribut und Wert."""
-        DeviceQuery = Query()
-        result = devices_table.search(DeviceQuery[attribute] == value)
-        if result:
-            device_data = result[0]
+        if attribute == 'device_name':
+            doc_id = devices_by_name.first(value)
+            device_data = devices_table.get(doc_id=doc_id) if doc_id is not None else None
+        else:
+            DeviceQuery = Query()
+            result = devices_table.search(DeviceQuery[attribute] == value)
+            device_data = result[0] if result else None
+        if device_data:
             return cls(
                 device_name=device_data['device_name'],
                 managed_by_user_id=device_data['managed_by_user_id'],
@@ -64,25 +529,201 @@ class Device:
         return None
 
     @classmethod
-    def get_reservations(cls):
-        """Gibt alle Reservierungen zurück."""
-        return reservations_table.all()
+    @cached('maintenance_rules')
+    def get_maintenance_rules(cls):
+        """Gibt die Wartungsregeln aller Geräte als Dictionary `device_name -> MaintenanceRule` zurück."""
+        return {r['device_name']: MaintenanceRule.from_dict(r) for r in maintenance_rules_table.all()}
 
     @classmethod
-    def get_maintenance_schedule(cls):
-        """Erstellt einen Wartungsplan für alle Geräte."""
-        schedule = []
-        for device in cls.find_all():
-            schedule.append({
-                "Gerät": device.device_name,
-                "Nächste Wartung": device.first_maintenance
+    @cached('reservations', 'maintenance_rules')
+    def get_reservations(cls, start_date=None, end_date=None):
+        """Gibt alle Reservierungen zurück, optional nur die im Zeitraum [start_date, end_date].
+
+        Wartungstermine aus den Regeln werden nur für das angefragte Fenster berechnet.
+        """
+        start = str(to_date(start_date)) if start_date is not None else None
+        end = str(to_date(end_date)) if end_date is not None else None
+        stored = database.read_range('reservations', start, end) if start or end else None
+        stored = reservations_table.all() if stored is None else [dict(r) for r in stored.values()]
+        reservations = [
+            r for r in stored
+            if (start is None or r['end_date'] >= start) and (end is None or r['start_date'] <= end)
+        ]
+        for device_name, rule in cls.get_maintenance_rules().items():
+            reservations.extend(_maintenance_reservations(device_name, rule, start_date, end_date))
+        return reservations
+
+    @classmethod
+    @cached('devices', 'reservations', 'maintenance_rules')
+    def get_reservations_with_devices(cls, device_name=None, reserver=None, start_date=None, end_date=None,
+                                      as_dataframe=False):
+        """Gibt die Reservierungen zusammen mit den Daten ihres Geräts zurück.
+
+        Geräte und Reservierungen werden je einmal durchlaufen und über `device_name`
+        verknüpft (Hash-Join). Optional gefiltert nach Gerät, Reservierer und Zeitraum;
+        mit `as_dataframe=True` als pandas DataFrame.
+        """
+        reservations = (
+            r for r in cls.get_reservations(start_date, end_date)
+            if (device_name is None or r.get('device_name') == device_name)
+            and (reserver is None or r.get('reserver') == reserver)
+        )
+        return cls.join_devices(reservations, as_dataframe)
+
+    @classmethod
+    def join_devices(cls, reservations, as_dataframe=False):
+        """Ergänzt jede Reservierung um die Daten ihres Geräts (ein Durchlauf über die Geräte)."""
+        devices = {d.device_name: d for d in cls.find_all()}
+        rows = []
+        for r in reservations:
+            device = devices.get(r.get('device_name'))
+            rows.append({
+                **r,
+                "managed_by_user_id": device.managed_by_user_id if device else None,
+                "end_of_life": device.end_of_life if device else None,
+                "maintenance_interval": device.maintenance_interval if device else None,
+                "first_maintenance": device.first_maintenance if device else None,
             })
-        return schedule
+        if as_dataframe:
+            import pandas as pd
+            return pd.DataFrame(rows)
+        return rows
+
+    @classmethod
+    @cached('reservations')
+    def _reservation_columns(cls, start_date=None, end_date=None):
+        """Gespeicherte Reservierungen als sortierter Spaltenspeicher (siehe `ReservationColumns`).
+
+        Mit Zeitraum werden, wo der Storage es kann, nur die Monate gelesen, die ihn
+        überlappen können (siehe `database.read_range`); der Speicher enthält dann
+        mindestens alle Reservierungen des Zeitraums.
+        """
+        # numpy erst laden, wenn Reservierungen gebraucht werden
+        from reservation_store import ReservationColumns
+        if start_date is not None or end_date is not None:
+            docs = database.read_range('reservations', start_date and str(to_date(start_date)),
+                                       end_date and str(to_date(end_date)))
+            if docs is None:
+                return cls._reservation_columns()
+            return ReservationColumns.from_rows(docs.values())
+        return ReservationColumns.from_rows(reservations_table.all())
+
+    @classmethod
+    def _iter_stored_reservations(cls, start_date=None, end_date=None, after=None):
+        """Sortierte gespeicherte Reservierungen ab dem Fenster bzw. Cursor, bis zum Fensterende."""
+        columns = cls._reservation_columns(start_date, end_date)
+        for i in range(columns.position(start_date, after), columns.stop(end_date)):
+            yield columns.row(i)
+
+    @classmethod
+    def reservation_view(cls, start_date=None, end_date=None, device_name=None, reserver=None):
+        """Gespeicherte Reservierungen im Zeitraum [start_date, end_date] als `ReservationView`.
+
+        Die Sicht verweist auf die Spalten des gemeinsamen Speichers, statt für jede
+        Zeile ein Dictionary anzulegen; Wartungstermine aus Regeln sind nicht enthalten.
+        """
+        return cls._reservation_columns(start_date, end_date).select(start_date, end_date, device_name, reserver)
+
+    @classmethod
+    def _iter_reservations(cls, start_date=None, end_date=None, device_name=None, reserver=None, after=None):
+        """Alle passenden Reservierungen und Wartungstermine, sortiert und ohne sie vollständig aufzubauen."""
+        start = str(to_date(start_date)) if start_date is not None else None
+        stored = (
+            r for r in cls._iter_stored_reservations(start_date, end_date, after)
+            if (start is None or r['end_date'] >= start)
+            and (device_name is None or r.get('device_name') == device_name)
+            and (reserver is None or r.get('reserver') == reserver)
+        )
+        streams = [stored]
+        if reserver in (None, "Maintenance"):
+            window_start = to_date(start_date) if start_date is not None else None
+            if after is not None:
+                cursor_date = to_date(after[0])
+                window_start = cursor_date if window_start is None else max(window_start, cursor_date)
+            rules = cls.get_maintenance_rules()
+            if device_name is not None:
+                rules = {device_name: rules[device_name]} if device_name in rules else {}
+            streams.extend(_maintenance_reservations(name, rule, window_start, end_date) for name, rule in rules.items())
+        merged = heapq.merge(*streams, key=_reservation_sort_key)
+        if after is not None:
+            after = tuple(after)
+            merged = (r for r in merged if _reservation_sort_key(r) > after)
+        return merged
+
+    @classmethod
+    def query_reservations(cls, start_date=None, end_date=None, device_name=None, reserver=None,
+                           limit=50, offset=0, after=None):
+        """Gibt eine Seite von Reservierungen zurück, sortiert nach Startdatum, Gerät und Reservierer.
+
+        Filter: Zeitraum [start_date, end_date], Gerät, Reservierer. Blättern entweder
+        über `offset` oder über den Cursor `after` (der `_reservation_sort_key` der
+        letzten Zeile der vorherigen Seite, siehe `reservation_cursor`). Es werden nur
+        so viele Einträge erzeugt, wie für die Seite nötig sind.
+        """
+        reservations = cls._iter_reservations(start_date, end_date, device_name, reserver, after)
+        return list(islice(reservations, offset, offset + limit if limit is not None else None))
+
+    @staticmethod
+    def reservation_cursor(reservation):
+        """Cursor für `query_reservations(after=...)` nach dieser Reservierung."""
+        return _reservation_sort_key(reservation)
+
+    @classmethod
+    @cached('reservations', 'maintenance_rules')
+    def count_reservations(cls, start_date=None, end_date=None, device_name=None, reserver=None):
+        """Anzahl der Reservierungen und Wartungstermine, die `query_reservations` liefern würde."""
+        total = len(cls.reservation_view(start_date, end_date, device_name, reserver))
+        if reserver in (None, "Maintenance"):
+            total += sum(rule.count(start_date, end_date) for name, rule in cls.get_maintenance_rules().items()
+                         if device_name is None or name == device_name)
+        return total
+
+    @classmethod
+    @cached('devices', 'reservations', 'maintenance_rules')
+    def maintenance_schedule(cls):
+        """Gibt den Wartungsplan aller Geräte als `MaintenanceSchedule` (NumPy-Arrays) zurück."""
+        return cls._build_maintenance_schedule()
+
+    @classmethod
+    def _build_maintenance_schedule(cls):
+        from maintenance_schedule import MaintenanceSchedule
+        completed = [(r['device_name'], r['start_date']) for r in cls._iter_stored_reservations()
+                     if r.get('reserver') == "Maintenance" and r.get('device_name')]
+        return MaintenanceSchedule.from_devices(cls.find_all(), cls.get_maintenance_rules(), completed)
+
+    @classmethod
+    def get_maintenance_schedule(cls, as_of=None):
+        """Erstellt einen Wartungsplan für alle Geräte mit dem nächsten fälligen Termin ab `as_of` (Standard: heute)."""
+        as_of = date.today() if as_of is None else to_date(as_of)
+        schedule = cls.maintenance_schedule()
+        next_due = schedule.next_due(as_of)
+        overdue_indexes, overdue_days = schedule.overdue(as_of)
+        overdue = dict(zip(overdue_indexes.tolist(), overdue_days.tolist()))
+        return [
+            {
+                "Gerät": name,
+                "Nächste Wartung": None if due is None else due.strftime("%d.%m.%Y"),
+                "Intervall (Tage)": int(interval),
+                "Überfällig seit (Tage)": overdue.get(i),
+            }
+            for i, (name, due, interval) in enumerate(zip(schedule.names, next_due.tolist(), schedule.interval))
+        ]
+
+    @classmethod
+    def _maintenance_costs(cls):
+        return maintenance_costs
 
     @classmethod
     def calculate_total_maintenance_cost(cls):
-        """Berechnet die Gesamtkosten aller Gerätewartungen."""
-        total_cost = 0
-        for device in cls.find_all():
-            total_cost += (365 / device.maintenance_interval) * 100  # Beispielkosten
-        return total_cost
+        """Berechnet die Gesamtkosten aller Gerätewartungen pro Jahr."""
+        return cls._maintenance_costs().total()
+
+    @classmethod
+    def maintenance_cost_by_user(cls):
+        """Jährliche Wartungskosten je Verantwortlichem (`managed_by_user_id -> Kosten`)."""
+        return cls._maintenance_costs().by_user()
+
+    @classmethod
+    def maintenance_cost_by_month(cls):
+        """Kosten der fälligen Wartungen für Januar bis Dezember des laufenden Jahres."""
+        return cls._maintenance_costs().by_month()
@@ -0,0 +1,235 @@
+import os
+from datetime import date, datetime, time
+from tinydb.middlewares import Middleware
+from tinydb.storages import Storage, touch
+from json_tables import dump_tables, read_table
+
+try:
+    import orjson
+except ImportError:  # Standardbibliothek als Rückfall
+    orjson = None
+    import json
+
+# Die einzigen Felder, in denen Datumswerte vorkommen
+DATE_FIELDS = ('end_of_life', 'first_maintenance', 'start_date', 'end_date')
+
+# Dieselben Tags wie tinydb_serialization (siehe serializer.py), damit vorhandene Dateien lesbar bleiben
+_TAGS = (
+    (datetime, '{TinyDateTime}:', datetime.fromisoformat),
+    (date, '{TinyDate}:', date.fromisoformat),
+    (time, '{TinyTime}:', time.fromisoformat),
+)
+
+
+def _loads(data):
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data.decode('utf-8'))
+
+
+def _dumps(obj):
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+
+def encode_value(value):
+    for obj_class, tag, _ in _TAGS:
+        if isinstance(value, obj_class):
+            return tag + value.isoformat()
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, str) and value.startswith('{Tiny'):
+        for _, tag, decode in _TAGS:
+            if value.startswith(tag):
+                return decode(value[len(tag):])
+    return value
+
+
+def _encode_table(table):
+    encoded = {}
+    for doc_id, doc in table.items():
+        if any(not isinstance(doc.get(field), (str, type(None))) for field in DATE_FIELDS):
+            doc = dict(doc)
+            for field in DATE_FIELDS:
+                if field in doc:
+                    doc[field] = encode_value(doc[field])
+        encoded[doc_id] = doc
+    return encoded
+
+
+def _decode_table(table):
+    decoded = {}
+    for doc_id, doc in table.items():
+        tagged = [field for field in DATE_FIELDS
+                  if isinstance(doc.get(field), str) and doc[field].startswith('{Tiny')]
+        if tagged:
+            doc = dict(doc)
+            for field in tagged:
+                doc[field] = decode_value(doc[field])
+        decoded[doc_id] = doc
+    return decoded
+
+
+class LazyTables(dict):
+    """Tabellen der Datenbank, deren Datumsfelder erst beim Zugriff auf die Tabelle dekodiert werden.
+
+    Nicht angefasste Tabellen werden beim Schreiben unverändert (bereits kodiert) übernommen.
+    """
+
+    def __init__(self, raw):
+        super().__init__(raw)
+        self.decoded = set()
+
+    def __getitem__(self, name):
+        if name not in self.decoded and dict.__contains__(self, name):
+            dict.__setitem__(self, name, _decode_table(dict.__getitem__(self, name)))
+            self.decoded.add(name)
+        return dict.__getitem__(self, name)
+
+    def __setitem__(self, name, table):
+        dict.__setitem__(self, name, table)
+        self.decoded.add(name)
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def encoded(self):
+        """Gibt die Tabellen in Speicherform zurück; nur dekodierte Tabellen werden neu kodiert."""
+        return {name: _encode_table(table) if name in self.decoded else table
+                for name, table in dict.items(self)}
+
+
+class FastJSONStorage(Storage):
+    """JSON-Storage mit schnellem Codec (orjson, falls installiert) und Lesecache.
+
+    Die Datei wird nur neu geparst, wenn sie sich seit dem letzten Lesen oder
+    Schreiben geändert hat. Geschrieben wird eine Tabelle je Zeile (siehe
+    json_tables.py), `read_table` parst nur die angefragte Tabelle.
+    """
+
+    def __init__(self, path, create_dirs=False, access_mode='r+', **kwargs):
+        self.path = path
+        self.on_reload = None
+        self._read_only = access_mode == 'r'
+        if not self._read_only:
+            touch(path, create_dirs=create_dirs)
+        self._cache = None
+        self._tables = {}
+        self._stamp = None
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _check_stamp(self):
+        """Verwirft die Caches, wenn ein anderer Prozess die Datei geändert hat, und meldet das."""
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            reloaded = self._stamp is not None
+            self._cache, self._tables, self._stamp = None, {}, stamp
+            if reloaded and self.on_reload:
+                self.on_reload()
+
+    def read(self):
+        self._check_stamp()
+        if self._cache is None:
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            self._cache = _loads(content) if content.strip() else None
+        return self._cache
+
+    def read_table(self, name):
+        """Die (noch kodierten) Dokumente der Tabelle `name`; die übrigen Tabellen werden nicht geparst."""
+        self._check_stamp()
+        if self._cache is not None:
+            return self._cache.get(name)
+        if name not in self._tables:
+            with open(self.path, 'rb') as f:
+                found, table = read_table(f.readline, name, _dumps, _loads)
+            if not found:
+                return (self.read() or {}).get(name)
+            self._tables[name] = table
+        return self._tables[name]
+
+    def refresh(self):
+        """Prüft, ob die Datei von außen geändert wurde; neu geparst wird erst beim nächsten Zugriff."""
+        self._check_stamp()
+
+    def invalidate(self):
+        """Verwirft den Lesecache, die Datei wird beim nächsten Zugriff neu gelesen."""
+        self._cache = None
+        self._tables = {}
+
+    def write(self, data):
+        if self._read_only:
+            raise IOError('Cannot write to the database. Access mode is "r".')
+        content = dump_tables(data, _dumps)
+        try:
+            with open(self.path, 'r+b') as f:
+                f.write(content)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            self._cache = None
+            raise
+        self._cache = data
+        self._tables = {}
+        self._stamp = self._file_stamp()
+
+
+class FastSerializationMiddleware(Middleware):
+    """Ersatz für `SerializationMiddleware` mit fest registrierten Datum/Zeit-Serialisierern.
+
+    Kodiert und dekodiert nur die bekannten Datumsfelder (`DATE_FIELDS`), und zwar
+    erst, wenn eine Tabelle tatsächlich gelesen wird. Das Dateiformat
+    (`{TinyDate}:...`, `{TinyDateTime}:...`, `{TinyTime}:...`) ist dasselbe.
+    """
+
+    def __init__(self, storage_cls=FastJSONStorage):
+        super().__init__(storage_cls)
+        self._raw = None
+        self._tables = None
+        self._decoded = {}
+
+    def read(self):
+        raw = self.storage.read()
+        if raw is None:
+            return None
+        if raw is not self._raw:
+            self._raw = raw
+            self._tables = LazyTables(raw)
+        return self._tables
+
+    def write(self, data):
+        tables = data if isinstance(data, LazyTables) else LazyTables({})
+        if not isinstance(data, LazyTables):
+            for name, table in data.items():
+                tables[name] = table
+        encoded = tables.encoded()
+        self.storage.write(encoded)
+        # Liefert der Storage beim nächsten Lesen ein anderes Objekt, wird neu verpackt
+        self._raw = encoded
+        self._tables = tables
+
+    def read_table(self, name):
+        """Die dekodierten Dokumente der Tabelle `name`; der Storage parst dafür nur diese Tabelle."""
+        if not hasattr(self.storage, 'read_table'):
+            return (self.read() or {}).get(name)
+        raw = self.storage.read_table(name)
+        if raw is None:
+            return None
+        decoded = self._decoded.get(name)
+        if decoded is None or decoded[0] is not raw:
+            decoded = self._decoded[name] = (raw, _decode_table(raw))
+        return decoded[1]
+
+    def close(self):
+        self.storage.close()
+
+
+# Fertige Storage-Kette für `TinyDB(path, storage=fast_serializer)`
+fast_serializer = FastSerializationMiddleware(FastJSONStorage)
@@ -0,0 +1,61 @@
+class HashIndex:
+    """In-Memory-Index über einer TinyDB-Tabelle: Schlüsselwert -> Liste der doc_ids.
+
+    Der Schlüssel besteht aus einem Feld (z.B. `"device_name"`) oder mehreren Feldern
+    (z.B. `("device_name", "start_date")`, dann ist der Schlüssel ein Tupel).
+    Der Index wird beim ersten Zugriff aus der Tabelle aufgebaut und muss bei jedem
+    Einfügen, Ändern und Entfernen über `add` / `discard` mitgeführt werden.
+    """
+
+    def __init__(self, table, fields):
+        self.table = table
+        self.fields = fields
+        self._doc_ids = None
+
+    def key_of(self, doc):
+        if isinstance(self.fields, str):
+            return doc.get(self.fields)
+        return tuple(doc.get(field) for field in self.fields)
+
+    def _index(self):
+        # Ein Storage mit Lesecache meldet hier Änderungen anderer Prozesse (siehe database.py)
+        refresh = getattr(self.table.storage, 'refresh', None)
+        if refresh:
+            refresh()
+        if self._doc_ids is None:
+            doc_ids = {}
+            for doc in self.table.all():
+                doc_ids.setdefault(self.key_of(doc), []).append(doc.doc_id)
+            self._doc_ids = doc_ids
+        return self._doc_ids
+
+    def invalidate(self):
+        """Verwirft den Index, er wird beim nächsten Zugriff neu aufgebaut."""
+        self._doc_ids = None
+
+    def get(self, key):
+        """Gibt alle doc_ids mit diesem Schlüssel zurück."""
+        return list(self._index().get(key, ()))
+
+    def first(self, key):
+        """Gibt die erste doc_id mit diesem Schlüssel zurück oder None."""
+        doc_ids = self._index().get(key)
+        return doc_ids[0] if doc_ids else None
+
+    def add(self, doc_id, doc):
+        # Noch nicht aufgebaut: der Aufbau liest das neue Dokument ohnehin aus der Tabelle
+        if self._doc_ids is not None:
+            self._doc_ids.setdefault(self.key_of(doc), []).append(doc_id)
+
+    def discard(self, doc_id, doc):
+        if self._doc_ids is None:
+            return
+        doc_ids = self._doc_ids.get(self.key_of(doc))
+        if doc_ids and doc_id in doc_ids:
+            doc_ids.remove(doc_id)
+            if not doc_ids:
+                del self._doc_ids[self.key_of(doc)]
+
+    def pop(self, key):
+        """Entfernt den Schlüssel aus dem Index und gibt seine doc_ids zurück."""
+        return self._index().pop(key, [])
@@ -0,0 +1,214 @@
+import functools
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from tinydb.table import Table
+
+# Messung einschalten mit DEVICE_PERF=1; JSON-Lines-Protokoll mit DEVICE_PERF_LOG=<Pfad>
+ENABLED = os.environ.get('DEVICE_PERF', '') not in ('', '0')
+LOG_PATH = os.environ.get('DEVICE_PERF_LOG')
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class Metrics:
+    """Messwerte eines Streamlit-Durchlaufs: Zeiten je Methode und Zähler für Storage und Abfragen."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.action = None
+        self.calls = {}  # Name -> [Anzahl, Sekunden]
+        self.model_seconds = 0.0  # nur äußerste Modellaufrufe, verschachtelte zählen nicht doppelt
+        self.depth = 0
+        self.storage_reads = 0
+        self.storage_writes = 0
+        self.storage_seconds = 0.0
+        self.queries = 0
+        self.documents_scanned = 0
+
+    def add_call(self, name, seconds):
+        entry = self.calls.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+    def to_dict(self):
+        total = time.perf_counter() - self.started
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "action": self.action,
+            "total_seconds": total,
+            "storage_reads": self.storage_reads,
+            "storage_writes": self.storage_writes,
+            "storage_seconds": self.storage_seconds,
+            "queries": self.queries,
+            "documents_scanned": self.documents_scanned,
+            "calls": {name: {"count": count, "seconds": seconds} for name, (count, seconds) in self.calls.items()},
+            # Grobe Schätzung: was nicht in Modell- oder Storage-Aufrufen steckt, ist Streamlit-Rendering
+            "model_seconds": self.model_seconds,
+            "other_seconds": max(total - self.model_seconds, 0.0),
+        }
+
+
+def current():
+    """Messwerte des laufenden Durchlaufs dieses Threads (oder None)."""
+    return getattr(_local, 'metrics', None)
+
+
+def begin_rerun():
+    if ENABLED:
+        _local.metrics = Metrics()
+
+
+def set_action(*parts):
+    metrics = current()
+    if metrics is not None:
+        metrics.action = " / ".join(str(p) for p in parts if p)
+
+
+def end_rerun():
+    """Schließt den Durchlauf ab, schreibt ihn ins Protokoll und gibt die Messwerte zurück."""
+    metrics = current()
+    if metrics is None:
+        return None
+    _local.metrics = None
+    record = metrics.to_dict()
+    if LOG_PATH:
+        with _log_lock, open(LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+    return record
+
+
+def render_panel(record):
+    """Zeigt die Messwerte eines Durchlaufs in der Seitenleiste an (opt-in über eine Checkbox)."""
+    if record is None:
+        return
+    import streamlit as st
+    if not st.sidebar.checkbox("Performance-Panel", key="perf_panel"):
+        return
+    st.sidebar.write(f"**{record['action']}** – {record['total_seconds'] * 1000:.1f} ms")
+    st.sidebar.write(
+        f"Storage: {record['storage_reads']} Lese-, {record['storage_writes']} Schreibzugriffe "
+        f"({record['storage_seconds'] * 1000:.1f} ms)"
+    )
+    st.sidebar.write(f"Abfragen: {record['queries']}, durchsuchte Dokumente: {record['documents_scanned']}")
+    st.sidebar.write(
+        f"Modell: {record['model_seconds'] * 1000:.1f} ms, Rendering/sonstiges: {record['other_seconds'] * 1000:.1f} ms"
+    )
+    st.sidebar.table([
+        {"Aufruf": name, "Anzahl": c["count"], "ms": round(c["seconds"] * 1000, 2)}
+        for name, c in sorted(record["calls"].items(), key=lambda item: -item[1]["seconds"])
+    ])
+
+
+def timed(name, func):
+    """Umhüllt `func` so, dass jeder Aufruf mit Dauer unter `name` gezählt wird."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        metrics = current()
+        if metrics is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        metrics.depth += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.depth -= 1
+            elapsed = time.perf_counter() - start
+            metrics.add_call(name, elapsed)
+            if metrics.depth == 0:
+                metrics.model_seconds += elapsed
+    return wrapper
+
+
+def instrument_class(cls):
+    """Misst alle öffentlichen Methoden von `cls` (einschließlich geerbter)."""
+    seen = set()
+    for klass in cls.__mro__[:-1]:
+        for attr_name, attr in vars(klass).items():
+            if attr_name.startswith('_') or attr_name in seen:
+                continue
+            seen.add(attr_name)
+            name = f"{cls.__name__}.{attr_name}"
+            if isinstance(attr, classmethod):
+                setattr(cls, attr_name, classmethod(timed(name, attr.__func__)))
+            elif isinstance(attr, staticmethod):
+                setattr(cls, attr_name, staticmethod(timed(name, attr.__func__)))
+            elif callable(attr):
+                setattr(cls, attr_name, timed(name, attr))
+    return cls
+
+
+def instrument_storage(storage):
+    """Zählt Lese- und Schreibzugriffe eines Storage-Objekts (auch einer Middleware)."""
+    read, write = storage.read, storage.write
+
+    def counted_read():
+        metrics = current()
+        if metrics is None:
+            return read()
+        start = time.perf_counter()
+        try:
+            return read()
+        finally:
+            metrics.storage_reads += 1
+            metrics.storage_seconds += time.perf_counter() - start
+
+    def counted_write(data):
+        metrics = current()
+        if metrics is None:
+            return write(data)
+        start = time.perf_counter()
+        try:
+            return write(data)
+        finally:
+            metrics.storage_writes += 1
+            metrics.storage_seconds += time.perf_counter() - start
+
+    storage.read, storage.write = counted_read, counted_write
+    return storage
+
+
+def _counting(cond):
+    """Umhüllt eine Query so, dass jedes geprüfte Dokument gezählt wird."""
+    metrics = current()
+    if metrics is None or cond is None:
+        return cond
+    metrics.queries += 1
+
+    def counted(doc):
+        metrics.documents_scanned += 1
+        return cond(doc)
+    return counted
+
+
+class InstrumentedTable(Table):
+    """TinyDB-Tabelle, die Abfragen und die dabei durchsuchten Dokumente zählt."""
+
+    def all(self):
+        docs = super().all()
+        metrics = current()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.documents_scanned += len(docs)
+        return docs
+
+    def search(self, cond):
+        return super().search(_counting(cond))
+
+    def get(self, cond=None, doc_id=None, doc_ids=None):
+        return super().get(_counting(cond), doc_id, doc_ids)
+
+    def contains(self, cond=None, doc_id=None):
+        return super().contains(_counting(cond), doc_id)
+
+    def update(self, fields, cond=None, doc_ids=None):
+        return super().update(fields, _counting(cond), doc_ids)
+
+    def remove(self, cond=None, doc_ids=None):
+        return super().remove(_counting(cond), doc_ids)
+
+    def count(self, cond):
+        return super().count(_counting(cond))
@@ -0,0 +1,49 @@
+from bisect import bisect_left, bisect_right, insort
+from math import inf
+
+
+class IntervalIndex:
+    """Sortierte Start- und Endpunkte der Reservierungen eines Geräts.
+
+    Zeiträume sind Tagesordinalzahlen (`date.toordinal()`), Start und Ende jeweils inklusive.
+    Überlappungen werden über zwei binäre Suchen gezählt, ohne alle Einträge zu durchlaufen.
+    """
+
+    def __init__(self):
+        self._by_start = []  # (start, end, reserver), sortiert nach Start
+        self._ends = []      # alle Endpunkte, sortiert
+
+    def __len__(self):
+        return len(self._by_start)
+
+    def add(self, start, end, reserver=""):
+        insort(self._by_start, (start, end, reserver))
+        insort(self._ends, end)
+
+    def remove_start(self, start):
+        """Entfernt alle Einträge, die an `start` beginnen."""
+        lo = bisect_left(self._by_start, (start,))
+        hi = bisect_right(self._by_start, (start, inf))
+        for _, end, _ in self._by_start[lo:hi]:
+            del self._ends[bisect_left(self._ends, end)]
+        del self._by_start[lo:hi]
+
+    def count_overlaps(self, start, end):
+        """Anzahl der Einträge, die [start, end] überlappen."""
+        starting_before_end = bisect_right(self._by_start, (end, inf))
+        ending_before_start = bisect_left(self._ends, start)
+        return starting_before_end - ending_before_start
+
+    def overlaps(self, start, end):
+        """Gibt alle Einträge `(start, end, reserver)` zurück, die [start, end] überlappen."""
+        remaining = self.count_overlaps(start, end)
+        result = []
+        i = bisect_right(self._by_start, (end, inf)) - 1
+        while remaining > 0 and i >= 0:
+            entry = self._by_start[i]
+            if entry[1] >= start:
+                result.append(entry)
+                remaining -= 1
+            i -= 1
+        result.reverse()
+        return result
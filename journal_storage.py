@@ -0,0 +1,334 @@
+import json
+import os
+import threading
+from tinydb.storages import Storage
+
+
+def _file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class _Document(dict):
+    """Dokument im Zustand von `JournalStorage`, merkt sich vor der ersten Änderung seinen Inhalt.
+
+    TinyDB ändert gelesene Dokumente an Ort und Stelle (`Table.update`); so findet
+    `write` die geänderten Dokumente, ohne alle zu vergleichen, und ein abgebrochener
+    Vorgang lässt sich zurücknehmen.
+    """
+
+    __slots__ = ('_originals', '_table', '_doc_id')
+
+    def __init__(self, data, originals, table, doc_id):
+        super().__init__(data)
+        self._originals = originals
+        self._table = table
+        self._doc_id = doc_id
+
+    def _touch(self):
+        key = (self._table, self._doc_id)
+        if key not in self._originals:
+            self._originals[key] = dict(self)
+
+    def __setitem__(self, key, value):
+        self._touch()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._touch()
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self._touch()
+        return super().__ior__(other)
+
+    def update(self, *args, **kwargs):
+        self._touch()
+        super().update(*args, **kwargs)
+
+    def pop(self, *args):
+        self._touch()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._touch()
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self._touch()
+        return super().setdefault(key, default)
+
+    def clear(self):
+        self._touch()
+        super().clear()
+
+
+class JournalStorage(Storage):
+    """Log-strukturierter Storage für TinyDB.
+
+    Der Zustand liegt als Snapshot in `path` (gleiches Format wie `JSONStorage`,
+    eine bestehende Datenbankdatei kann also direkt geöffnet werden). Jeder
+    Schreibvorgang hängt nur die Änderung als eine JSON-Zeile an `path + '.journal'`
+    an. Beim Öffnen wird das Journal auf den Snapshot angewendet; ein abgerissener
+    letzter Eintrag (z.B. nach einem Absturz) wird verworfen. Überschreitet das
+    Journal `compact_threshold` Bytes, wird im Hintergrund ein neuer Snapshot
+    geschrieben und das Journal gekürzt.
+
+    `read` gibt den Zustand selbst zurück, nicht eine Kopie: TinyDB ersetzt beim
+    Schreiben nur die Tabelle, die es ändert, und ändert Dokumente an Ort und Stelle,
+    die sich das Dokument merkt (`_Document`). `write` vergleicht daher nur die
+    Schlüssel ersetzter Tabellen und schreibt neue, entfernte und geänderte
+    Dokumente; ein Schreibvorgang kostet so viel wie seine Änderung.
+
+    Verwendbar wie jeder TinyDB-Storage: `TinyDB(path, storage=JournalStorage)`. Hinter
+    einer Middleware, die gelesene Dokumente verändert (z.B. `SerializationMiddleware`),
+    wird er nicht unterstützt: solche Änderungen sieht `write` nicht.
+    """
+
+    def __init__(self, path, compact_threshold=4 * 1024 * 1024, background=True,
+                 create_dirs=False, encoding='utf-8', access_mode='r+', **kwargs):
+        if create_dirs:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.compact_threshold = compact_threshold
+        self.background = background
+        self.on_reload = None
+        self._encoding = encoding
+        self._read_only = access_mode == 'r'
+        self._kwargs = kwargs
+        self._lock = threading.RLock()
+        self._compaction = None
+        self._journal = None
+        self._originals = {}  # (Tabelle, doc_id) -> Inhalt vor der ersten ungeschriebenen Änderung
+        self._load(truncate_torn=not self._read_only)
+
+    # -- Laden und Wiederholen --------------------------------------------------
+
+    def _load(self, truncate_torn=False):
+        with self._lock:
+            self._snapshot_stamp = _file_stamp(self.path)
+            self._state = {}
+            self._originals.clear()
+            if self._snapshot_stamp and self._snapshot_stamp[2] > 0:
+                with open(self.path, encoding=self._encoding) as f:
+                    self._state = {table: self._documents(table, docs) for table, docs in json.load(f).items()}
+            self._offset = 0
+            self._replay(truncate_torn)
+
+    def _replay(self, truncate_torn=False):
+        """Wendet alle vollständigen Journal-Einträge ab `self._offset` an."""
+        if not os.path.exists(self.journal_path):
+            self._journal_stamp = None
+            return
+        with open(self.journal_path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read()
+        position = 0
+        while position < len(chunk):
+            end = chunk.find(b'\n', position)
+            if end < 0:
+                break  # abgerissener letzter Eintrag
+            try:
+                record = json.loads(chunk[position:end].decode(self._encoding))
+            except ValueError:
+                if chunk[end + 1:].strip():
+                    raise
+                break  # beschädigter letzter Eintrag
+            self._apply(record)
+            position = end + 1
+        self._offset += position
+        if truncate_torn and position < len(chunk):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(self._offset)
+        self._journal_stamp = _file_stamp(self.journal_path)
+
+    def _documents(self, table, docs):
+        return {doc_id: _Document(doc, self._originals, table, doc_id) for doc_id, doc in docs.items()}
+
+    def _apply(self, record):
+        for table in record.get('drop', ()):
+            self._state.pop(table, None)
+        for table, docs in record.get('set', {}).items():
+            self._state.setdefault(table, {}).update(self._documents(table, docs))
+        for table, doc_ids in record.get('del', {}).items():
+            docs = self._state.get(table, {})
+            for doc_id in doc_ids:
+                docs.pop(doc_id, None)
+
+    def refresh(self):
+        """Übernimmt Änderungen anderer Prozesse (neuer Snapshot oder angehängte Einträge)."""
+        with self._lock:
+            snapshot_stamp = _file_stamp(self.path)
+            journal_stamp = _file_stamp(self.journal_path)
+            if snapshot_stamp == self._snapshot_stamp and journal_stamp == self._journal_stamp:
+                return
+            if (snapshot_stamp != self._snapshot_stamp or journal_stamp is None
+                    or self._journal_stamp is None or journal_stamp[0] != self._journal_stamp[0]
+                    or journal_stamp[2] < self._offset):
+                self._close_journal()
+                self._load()
+            else:
+                self._replay()
+        if self.on_reload:
+            self.on_reload()
+
+    def invalidate(self):
+        """Lädt Snapshot und Journal beim nächsten Zugriff neu."""
+        with self._lock:
+            self._snapshot_stamp = None
+
+    # -- Storage-Schnittstelle --------------------------------------------------
+
+    def read(self):
+        self.refresh()
+        with self._lock:
+            if self._originals:
+                self._rollback()
+            if not self._state:
+                return None
+            # Eigenes äußeres Dictionary: TinyDB setzt darin die geänderte Tabelle neu
+            return dict(self._state)
+
+    def _rollback(self):
+        """Nimmt Änderungen an Ort und Stelle zurück, die nie geschrieben wurden (z.B. nach einer Ausnahme)."""
+        for (table, doc_id), original in self._originals.items():
+            docs = self._state.get(table)
+            if docs is not None and doc_id in docs:
+                docs[doc_id] = _Document(original, self._originals, table, doc_id)
+        self._originals.clear()
+
+    def read_table(self, name):
+        """Die Dokumente der Tabelle `name` ohne Kopie des übrigen Zustands (nicht verändern)."""
+        self.refresh()
+        with self._lock:
+            return self._state.get(name)
+
+    def write(self, data):
+        if self._read_only:
+            raise IOError('Cannot write to the database. Access mode is "r".')
+        with self._lock:
+            record = self._diff(data)
+            self._originals.clear()
+            if not record:
+                return
+            try:
+                line = (json.dumps(record, **self._kwargs) + '\n').encode(self._encoding)
+                if self._journal is None:
+                    self._journal = open(self.journal_path, 'ab')
+                self._journal.write(line)
+                self._journal.flush()
+                os.fsync(self._journal.fileno())
+            except Exception:
+                # Der Zustand enthält evtl. schon Änderungen an Ort und Stelle: wie auf der Platte neu laden
+                self._close_journal()
+                self._load(truncate_torn=True)
+                raise
+            self._apply(record)
+            self._offset += len(line)
+            self._journal_stamp = _file_stamp(self.journal_path)
+            if self._offset > self.compact_threshold and self._compaction is None:
+                if self.background:
+                    self._compaction = threading.Thread(target=self.compact, daemon=True)
+                    self._compaction.start()
+                else:
+                    self._compaction = True
+                    self.compact()
+
+    def close(self):
+        compaction = self._compaction
+        if isinstance(compaction, threading.Thread):
+            compaction.join()
+        with self._lock:
+            self._close_journal()
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _diff(self, data):
+        """Ermittelt die Änderungen zwischen dem aktuellen Zustand und `data`.
+
+        Unveränderte Tabellen sind dasselbe Objekt wie im Zustand; in ersetzten Tabellen
+        stehen neue Dokumente am Ende, geänderte in `_originals`. Alle Schlüssel werden
+        nur verglichen, wenn Dokumente entfernt wurden.
+        """
+        data = data or {}
+        record = {}
+        dropped = [table for table in self._state if table not in data]
+        if dropped:
+            record['drop'] = dropped
+        touched = {}
+        for table, doc_id in self._originals:
+            touched.setdefault(table, set()).add(doc_id)
+        for table, docs in data.items():
+            old_docs = self._state.get(table)
+            if old_docs is None:
+                record.setdefault('set', {})[table] = {doc_id: dict(doc) for doc_id, doc in docs.items()}
+                continue
+            if docs is old_docs:
+                changed = {doc_id: dict(docs[doc_id]) for doc_id in touched.get(table, ()) if doc_id in docs}
+                removed = []
+            else:
+                # TinyDB hängt neue Dokumente hinten an; nur wenn welche fehlen, alle Schlüssel vergleichen
+                added = []
+                for doc_id in reversed(docs):
+                    if doc_id in old_docs:
+                        break
+                    added.append(doc_id)
+                changed = {doc_id: dict(docs[doc_id])
+                           for doc_id in [*touched.get(table, ()), *reversed(added)] if doc_id in docs}
+                removed = list(old_docs.keys() - docs.keys()) if len(old_docs) + len(added) != len(docs) else []
+            if changed:
+                record.setdefault('set', {})[table] = changed
+            if removed:
+                record.setdefault('del', {})[table] = removed
+        return record
+
+    # -- Kompaktierung -------------------------------------------------------------
+
+    def compact(self):
+        """Schreibt den aktuellen Zustand als Snapshot und kürzt das Journal entsprechend.
+
+        Einträge, die während des Schreibens hinzukommen, bleiben im Journal. Bricht
+        der Vorgang ab, ergibt das erneute Anwenden des Journals denselben Zustand,
+        weil jeder Eintrag vollständige Dokumente setzt bzw. löscht.
+        """
+        try:
+            with self._lock:
+                # Dokumente kopieren, TinyDB ändert sie an Ort und Stelle; noch nicht geschriebene
+                # Änderungen gehören nicht in den Snapshot (erst kopieren, dann `_originals` lesen)
+                state = {table: {doc_id: dict(doc) for doc_id, doc in docs.items()}
+                         for table, docs in self._state.items()}
+                for (table, doc_id), original in list(self._originals.items()):
+                    if doc_id in state.get(table, {}):
+                        state[table][doc_id] = original
+                offset = self._offset
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding=self._encoding) as f:
+                f.write(json.dumps(state, **self._kwargs))
+                f.flush()
+                os.fsync(f.fileno())
+            with self._lock:
+                os.replace(tmp_path, self.path)
+                self._snapshot_stamp = _file_stamp(self.path)
+                self._close_journal()
+                tail = b''
+                if os.path.exists(self.journal_path):
+                    with open(self.journal_path, 'rb') as f:
+                        f.seek(offset)
+                        tail = f.read()
+                tmp_journal = self.journal_path + '.tmp'
+                with open(tmp_journal, 'wb') as f:
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_journal, self.journal_path)
+                self._offset = len(tail)
+                self._journal_stamp = _file_stamp(self.journal_path)
+        finally:
+            self._compaction = None
@@ -0,0 +1,57 @@
+"""Tabellenweises Schreiben und Lesen von TinyDB-JSON-Dateien.
+
+Die JSON-Storages schreiben jede Tabelle in eine eigene Zeile:
+
+    {
+    "users": {"1": {...}, ...},
+    "devices": {...}
+    }
+
+Das ist weiterhin gültiges JSON im Format von TinyDB. Da JSON-Strings keine rohen
+Zeilenumbrüche enthalten, lässt sich eine einzelne Tabelle Zeile für Zeile finden
+und parsen, ohne die übrigen (z.B. die große Reservierungstabelle) zu dekodieren.
+Dateien in einem anderen Layout werden wie bisher vollständig gelesen.
+"""
+
+
+def _like(text, sample):
+    """`text` als str oder bytes, passend zu `sample`."""
+    return text.encode() if isinstance(sample, bytes) else text
+
+
+def dump_tables(data, dumps):
+    """Serialisiert `{tabelle: dokumente}` mit einer Zeile je Tabelle; `dumps` liefert str oder bytes."""
+    names = [dumps(name) for name in data]
+    if not names:
+        return dumps(data)
+    sample = names[0]
+    body = _like(",\n", sample).join(name + _like(": ", sample) + dumps(table)
+                                     for name, table in zip(names, data.values()))
+    return _like("{\n", sample) + body + _like("\n}", sample)
+
+
+def read_table(readline, name, dumps, loads):
+    """Sucht die Tabelle `name` in einer Datei, von der `readline` nacheinander die Zeilen liefert.
+
+    Gibt `(True, tabelle)` zurück (`tabelle` ist None, wenn die Datei sie nicht enthält)
+    oder `(False, None)`, wenn die Datei nicht im Zeilenlayout geschrieben wurde.
+    """
+    first = readline()
+    if not first.strip():
+        return True, None
+    if first.strip() != _like("{", first):
+        return False, None
+    prefix = dumps(name) + _like(": ", first)
+    while line := readline():
+        if not line.startswith(_like('"', line)) and line.strip() != _like("}", line):
+            return False, None
+        if line.startswith(prefix):
+            value = line[len(prefix):].rstrip()
+            if value.endswith(_like(",", value)):
+                value = value[:-1]
+            try:
+                return True, loads(value)
+            except ValueError:
+                # Z.B. mit `indent` geschrieben: die Tabelle reicht über mehrere Zeilen
+                return False, None
+    return True, None
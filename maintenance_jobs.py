@@ -0,0 +1,101 @@
+import os
+from datetime import datetime, timedelta
+from tinydb import Query
+import database
+
+# Planungshorizont: Wartungsregeln reichen so viele Tage über heute hinaus (höchstens bis End-of-Life)
+HORIZON_DAYS = int(os.environ.get('DEVICE_MAINTENANCE_HORIZON_DAYS', 365))
+
+# Laufende Aufträge, die so lange nicht abgeschlossen wurden, gelten als verwaist (Worker abgebrochen)
+STALE_AFTER = timedelta(minutes=10)
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+STATUSES = (PENDING, RUNNING, DONE, FAILED)
+
+jobs_table = database.table('maintenance_jobs')
+
+
+def timestamp():
+    """Aktueller Zeitpunkt als ISO-String (sekundengenau), wie er in den Aufträgen steht."""
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class MaintenanceJobs:
+    """Persistente Auftragsliste des Wartungs-Workers (siehe maintenance_worker.py).
+
+    Ein Auftrag lautet "Wartungsregel von Gerät X anlegen bzw. bis zum Horizont verlängern"
+    und durchläuft die Zustände `pending` -> `running` -> `done` / `failed`. Die
+    Oberfläche legt Aufträge nur an und liest den Fortschritt, abgearbeitet werden sie
+    im Worker-Prozess. Je Gerät gibt es höchstens einen offenen Auftrag.
+    """
+
+    @classmethod
+    def enqueue(cls, device_names):
+        """Legt je Gerät einen Auftrag an, sofern noch keiner wartet; gibt die Anzahl neuer Aufträge zurück."""
+        Job = Query()
+        waiting = {job['device_name'] for job in jobs_table.search(Job.status == PENDING)}
+        created = timestamp()
+        jobs = [{"device_name": name, "status": PENDING, "created": created, "finished": None, "error": None}
+                for name in dict.fromkeys(device_names) if name not in waiting]
+        jobs_table.insert_multiple(jobs)
+        return len(jobs)
+
+    @classmethod
+    def claim(cls, limit):
+        """Markiert die ältesten `limit` wartenden Aufträge als laufend und gibt sie als `{"id", "device_name"}` zurück.
+
+        Suchen und Markieren laufen unter der Datenbanksperre, damit zwei Worker nie
+        dieselben Aufträge übernehmen.
+        """
+        Job = Query()
+        with database.lock:
+            jobs = sorted(jobs_table.search(Job.status == PENDING), key=lambda job: job.doc_id)[:limit]
+            if jobs:
+                jobs_table.update({"status": RUNNING, "claimed": timestamp()}, doc_ids=[job.doc_id for job in jobs])
+        return [{"id": job.doc_id, "device_name": job['device_name']} for job in jobs]
+
+    @classmethod
+    def complete(cls, job_ids):
+        """Markiert die Aufträge als erledigt."""
+        if job_ids:
+            jobs_table.update({"status": DONE, "finished": timestamp(), "error": None}, doc_ids=list(job_ids))
+
+    @classmethod
+    def fail(cls, job_ids, error):
+        """Markiert die Aufträge mit der Fehlermeldung `error` als fehlgeschlagen."""
+        if job_ids:
+            jobs_table.update({"status": FAILED, "finished": timestamp(), "error": str(error)}, doc_ids=list(job_ids))
+
+    @classmethod
+    def requeue_running(cls, claimed_before=None):
+        """Setzt verwaiste laufende Aufträge zurück, z.B. nach einem Abbruch des Workers; gibt ihre Anzahl zurück.
+
+        Zurückgesetzt werden nur Aufträge, die vor `claimed_before` (Standard: vor `STALE_AFTER`)
+        übernommen wurden, damit die eines anderen, noch laufenden Workers unberührt bleiben.
+        """
+        if claimed_before is None:
+            claimed_before = (datetime.now() - STALE_AFTER).isoformat(timespec='seconds')
+        claimed_before = str(claimed_before)
+        Job = Query()
+        recent = Job.claimed.test(lambda claimed: claimed is not None and claimed >= claimed_before)
+        return len(jobs_table.update({"status": PENDING}, (Job.status == RUNNING) & ~recent))
+
+    @classmethod
+    def prune(cls, finished_before):
+        """Entfernt abgeschlossene Aufträge, die vor `finished_before` (ISO-Zeitstempel) beendet wurden."""
+        Job = Query()
+        return len(jobs_table.remove(Job.status.one_of([DONE, FAILED]) & (Job.finished < str(finished_before))))
+
+    @classmethod
+    def progress(cls, failed_limit=20):
+        """Anzahl der Aufträge je Zustand, Zeitpunkt des letzten Abschlusses und die letzten Fehler."""
+        counts = dict.fromkeys(STATUSES, 0)
+        last_finished, failed = None, []
+        for job in jobs_table:
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+            if job.get('finished') and (last_finished is None or job['finished'] > last_finished):
+                last_finished = job['finished']
+            if job['status'] == FAILED:
+                failed.append({"device_name": job['device_name'], "finished": job['finished'], "error": job['error']})
+        failed.sort(key=lambda job: job['finished'], reverse=True)
+        return {**counts, "last_finished": last_finished, "failed_jobs": failed[:failed_limit]}
@@ -0,0 +1,186 @@
+from datetime import date
+import numpy as np
+from recurrence import to_date
+
+# Tage werden als Tage seit 1970-01-01 gerechnet (int64), wie bei `datetime64[D]`
+_NONE = np.iinfo(np.int64).min
+# 1970-01-01 war ein Donnerstag, der erste Montag ist Tag 4
+_FIRST_MONDAY = 4
+
+
+def to_day(value):
+    """Tage seit 1970-01-01 für ein Datum, einen Zeitstempel oder einen ISO-String."""
+    return (to_date(value) - date(1970, 1, 1)).days
+
+
+def to_days(values):
+    """Wandelt Datumswerte (ISO-Strings oder `date`) in ein Array von Tagen um."""
+    return np.array([str(v)[:10] for v in values], dtype='datetime64[D]').astype(np.int64)
+
+
+def _as_dates(days):
+    """Tage in `datetime64[D]`; fehlende Werte werden zu NaT."""
+    result = days.astype('datetime64[D]')
+    result[days == _NONE] = np.datetime64('NaT')
+    return result
+
+
+class MaintenanceSchedule:
+    """Wartungsplan aller Geräte als NumPy-Arrays (erste Wartung, Intervall, End-of-Life).
+
+    Alle Abfragen rechnen für die ganze Flotte auf einmal mit Array-Arithmetik, ohne
+    einzelne Termine zu erzeugen. Abgesagte Termine (Ausnahmen der Wartungsregeln) und
+    eingetragene Wartungen (Reservierungen für 'Maintenance') werden berücksichtigt.
+    """
+
+    def __init__(self, names, start, interval, end, has_rule=None, exceptions=(), completed=()):
+        self.names = list(names)
+        self.start = np.asarray(start, dtype=np.int64)
+        self.interval = np.asarray(interval, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.has_rule = (np.ones(len(self.names), dtype=bool) if has_rule is None
+                         else np.asarray(has_rule, dtype=bool))
+        # (Geräteindex, Tag) abgesagter bzw. eingetragener Wartungen
+        self.exception_device, self.exception_day = self._pairs(exceptions)
+        on_grid = self._on_grid(self.exception_device, self.exception_day)
+        self.exception_device, self.exception_day = self.exception_device[on_grid], self.exception_day[on_grid]
+        self.completed_device, self.completed_day = self._pairs(completed)
+        self._exception_keys = np.unique(self._key(self.exception_device, self.exception_day))
+
+    @staticmethod
+    def _pairs(pairs):
+        pairs = np.asarray(list(pairs), dtype=np.int64).reshape(-1, 2)
+        return pairs[:, 0], pairs[:, 1]
+
+    def _on_grid(self, device, day):
+        """Prüft, ob die Tage auf dem Wartungsraster des jeweiligen Geräts liegen."""
+        start, interval, end = self.start[device], self.interval[device], self.end[device]
+        return (interval >= 1) & (start <= day) & (day <= end) & ((day - start) % np.maximum(interval, 1) == 0)
+
+    def _key(self, device, day):
+        return device * (1 << 32) + (day - np.iinfo(np.int32).min)
+
+    @classmethod
+    def from_devices(cls, devices, rules=None, completed=()):
+        """Baut den Plan aus Geräten, ihren Wartungsregeln (`device_name -> MaintenanceRule`)
+        und eingetragenen Wartungen (`(device_name, datum)`-Paare)."""
+        rules = rules or {}
+        names = [d.device_name for d in devices]
+        position = {name: i for i, name in enumerate(names)}
+        exceptions = [(position[name], to_day(day))
+                      for name, rule in rules.items() if name in position
+                      for day in rule.exceptions]
+        completed = [(position[name], to_day(day)) for name, day in completed if name in position]
+        return cls(
+            names,
+            to_days(d.first_maintenance for d in devices),
+            np.array([int(d.maintenance_interval or 0) for d in devices], dtype=np.int64),
+            to_days(d.end_of_life for d in devices),
+            has_rule=[name in rules for name in names],
+            exceptions=exceptions,
+            completed=completed,
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def _valid(self):
+        return (self.interval >= 1) & (self.start <= self.end)
+
+    def _is_exception(self, day):
+        keys = self._key(np.arange(len(self)), day)
+        return np.isin(keys, self._exception_keys)
+
+    def next_due_days(self, as_of):
+        """Nächster nicht abgesagter Termin am oder nach `as_of` je Gerät (Tage, `_NONE` wenn keiner)."""
+        as_of = to_day(as_of)
+        interval = np.maximum(self.interval, 1)
+        steps = -(-np.maximum(as_of - self.start, 0) // interval)
+        due = self.start + steps * interval
+        # Abgesagte Termine überspringen; meist sind nur wenige Geräte betroffen
+        skip = self._is_exception(due)
+        while skip.any():
+            due[skip] += interval[skip]
+            skip &= self._is_exception(due)
+        return np.where(self._valid() & (due <= self.end), due, _NONE)
+
+    def next_due(self, as_of):
+        """Nächster fälliger Wartungstermin je Gerät als `datetime64[D]` (NaT, wenn keiner mehr folgt)."""
+        return _as_dates(self.next_due_days(as_of))
+
+    def last_due_days(self, as_of):
+        """Letzter Rastertermin am oder vor `as_of` je Gerät (Tage, `_NONE` wenn keiner)."""
+        as_of = to_day(as_of)
+        interval = np.maximum(self.interval, 1)
+        last = np.minimum(as_of, self.end)
+        due = self.start + (last - self.start) // interval * interval
+        return np.where(self._valid() & (last >= self.start), due, _NONE)
+
+    def overdue(self, as_of):
+        """Indizes der überfälligen Geräte und die Tage seit Fälligkeit.
+
+        Überfällig ist ein Gerät, dessen letzter fälliger Termin nicht über die
+        Wartungsregel abgedeckt ist (keine Regel oder Termin abgesagt) und für das
+        seit diesem Termin bis `as_of` keine Wartung eingetragen wurde.
+        """
+        as_day = to_day(as_of)
+        due = self.last_due_days(as_of)
+        covered = self.has_rule & ~self._is_exception(due)
+        last_done = np.full(len(self), _NONE, dtype=np.int64)
+        done = self.completed_day <= as_day
+        np.maximum.at(last_done, self.completed_device[done], self.completed_day[done])
+        late = (due != _NONE) & ~covered & (last_done < due)
+        indexes = np.flatnonzero(late)
+        return indexes, as_day - due[indexes]
+
+    def occurrence_counts(self, start, end):
+        """Anzahl der nicht abgesagten Termine je Gerät im Fenster [start, end]."""
+        first_day, last_day = to_day(start), to_day(end)
+        interval = np.maximum(self.interval, 1)
+        window_start = np.maximum(self.start, first_day)
+        window_end = np.minimum(self.end, last_day)
+        first = -(-(window_start - self.start) // interval)
+        last = (window_end - self.start) // interval
+        counts = np.where(self._valid() & (window_start <= window_end), np.maximum(last - first + 1, 0), 0)
+        cancelled = (self.exception_day >= first_day) & (self.exception_day <= last_day)
+        if cancelled.any():
+            counts -= np.bincount(self.exception_device[cancelled], minlength=len(self))
+        return counts
+
+    def load_calendar(self, start, end, freq="D", as_dataframe=False):
+        """Anzahl fälliger Wartungen je Tag (`freq="D"`) oder Woche ab Montag (`freq="W"`) in [start, end].
+
+        Gibt `(tage, anzahl)` als Arrays zurück, mit `as_dataframe=True` als pandas DataFrame.
+        """
+        first_day, last_day = to_day(start), to_day(end)
+        length = max(last_day - first_day + 1, 0)
+        counts = np.zeros(length, dtype=np.int64)
+        window_end = np.minimum(self.end, last_day)
+        interval = np.maximum(self.interval, 1)
+        first = self.start + (-(-np.maximum(first_day - self.start, 0) // interval)) * interval
+        last = self.start + (window_end - self.start) // interval * interval
+        active = self._valid() & (window_end >= self.start) & (first <= last)
+        # Je Intervall ein Differenzen-Array: +1 am ersten, -1 nach dem letzten Termin im
+        # Fenster, anschließend kumulierte Summe mit Schrittweite `step`
+        for step in np.unique(interval[active]):
+            group = active & (interval == step)
+            size = -(-(length + step) // step) * step
+            diff = (np.bincount(first[group] - first_day, minlength=size)
+                    - np.bincount(last[group] - first_day + step, minlength=size))
+            counts += diff.reshape(-1, step).cumsum(axis=0).ravel()[:length]
+        cancelled = (self.exception_day >= first_day) & (self.exception_day <= last_day)
+        if cancelled.any():
+            counts -= np.bincount(self.exception_day[cancelled] - first_day, minlength=length)
+
+        days = np.arange(first_day, first_day + length, dtype=np.int64)
+        if freq == "W":
+            weeks = (days - _FIRST_MONDAY) // 7
+            counts = np.bincount(weeks - weeks[0], weights=counts).astype(np.int64) if length else counts
+            days = (np.unique(weeks) * 7 + _FIRST_MONDAY) if length else days
+        elif freq != "D":
+            raise ValueError(f"Unbekannte Frequenz: {freq}")
+        days = days.astype('datetime64[D]')
+        if as_dataframe:
+            import pandas as pd
+            return pd.DataFrame({"Wartungen": counts}, index=pd.DatetimeIndex(days, name="Datum"))
+        return days, counts
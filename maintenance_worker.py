@@ -0,0 +1,138 @@
+"""Hintergrund-Worker für die Wartungsplanung.
+
+Aufruf aus dem Projektverzeichnis (gleiche Umgebungsvariablen wie die Oberfläche):
+    python maintenance_worker.py            # läuft dauerhaft, Ende mit Strg+C
+    python maintenance_worker.py --once     # offene Aufträge abarbeiten und beenden (z.B. per cron)
+
+Der Worker arbeitet die Aufträge aus `maintenance_jobs` stapelweise ab: je Gerät wird
+die Wartungsregel angelegt bzw. bis heute + Horizont verlängert. Außerdem prüft er
+regelmäßig, welche Regeln vor heute + halbem Horizont enden, und legt für diese
+Geräte neue Aufträge an, sodass der Horizont mitrollt; dabei werden Aufträge eines
+abgebrochenen Workers nach `STALE_AFTER` erneut eingeplant. Mit TinyDB sollte nur ein
+Worker laufen; die JSON-Datei wird bei jedem Schreibvorgang ganz ersetzt, für
+dauerhaften Parallelbetrieb mit der Oberfläche ist die SQLite-Engine besser geeignet.
+"""
+import argparse
+import asyncio
+import signal
+from datetime import date, datetime, timedelta
+from maintenance_jobs import HORIZON_DAYS
+from models import Device, MaintenanceJobs
+
+BATCH_SIZE = 200
+POLL_SECONDS = 2.0
+ROLL_FORWARD_SECONDS = 3600.0
+# Erledigte und fehlgeschlagene Aufträge bleiben so lange für die Fortschrittsanzeige stehen
+KEEP_FINISHED = timedelta(days=1)
+
+
+def roll_forward(horizon_days=HORIZON_DAYS):
+    """Legt Aufträge für alle Geräte an, deren Regel vor heute + halbem Horizont endet; gibt ihre Anzahl zurück."""
+    before = date.today() + timedelta(days=horizon_days // 2)
+    return MaintenanceJobs.enqueue(Device.devices_behind_horizon(before))
+
+
+def process_batch(batch_size=BATCH_SIZE, horizon_days=HORIZON_DAYS):
+    """Arbeitet bis zu `batch_size` wartende Aufträge ab; gibt die Anzahl der bearbeiteten Aufträge zurück."""
+    jobs = MaintenanceJobs.claim(batch_size)
+    if not jobs:
+        return 0
+    devices = {}
+    for job in jobs:
+        if job["device_name"] not in devices:
+            devices[job["device_name"]] = Device.find_by_attribute("device_name", job["device_name"])
+    found = [job["id"] for job in jobs if devices[job["device_name"]] is not None]
+    try:
+        collisions = Device.extend_maintenance_rules([d for d in devices.values() if d is not None],
+                                                     date.today() + timedelta(days=horizon_days))
+    except Exception as e:
+        MaintenanceJobs.fail(found, e)
+    else:
+        # Termine auf bestehenden Reservierungen wurden ausgesetzt; die Aufträge melden das als Fehler
+        skipped = {}
+        for collision in collisions:
+            skipped.setdefault(collision["device_name"], []).append(
+                f"{collision['date']} ({collision['reserver']})")
+        MaintenanceJobs.complete([job["id"] for job in jobs
+                                  if devices[job["device_name"]] is not None and job["device_name"] not in skipped])
+        for device_name, dates in skipped.items():
+            MaintenanceJobs.fail([job["id"] for job in jobs if job["device_name"] == device_name],
+                                 f"Wartung fällt auf bestehende Reservierungen und wurde ausgesetzt: {', '.join(dates)}")
+    MaintenanceJobs.fail([job["id"] for job in jobs if devices[job["device_name"]] is None], "Gerät nicht gefunden")
+    return len(jobs)
+
+
+def _cleanup():
+    return MaintenanceJobs.prune((datetime.now() - KEEP_FINISHED).isoformat(timespec='seconds'))
+
+
+async def run(batch_size=BATCH_SIZE, poll_seconds=POLL_SECONDS, roll_forward_seconds=ROLL_FORWARD_SECONDS,
+              horizon_days=HORIZON_DAYS, once=False):
+    """Verarbeitet Aufträge und rollt den Horizont fort, bis `stop()` bzw. ein Signal kommt.
+
+    Die Datenbankzugriffe laufen in einem Thread, damit die Schleife nicht blockiert;
+    ein Lock sorgt dafür, dass immer nur einer gleichzeitig läuft (TinyDB ist nicht threadsicher).
+    Mit `once=True` wird einmal fortgerollt, alles Wartende abgearbeitet und beendet.
+    """
+    stop = asyncio.Event()
+    lock = asyncio.Lock()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # z.B. unter Windows oder außerhalb des Hauptthreads
+
+    async def db(func, *args):
+        async with lock:
+            return await asyncio.to_thread(func, *args)
+
+    async def sleep(seconds):
+        try:
+            await asyncio.wait_for(stop.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def roll_forward_loop():
+        while not stop.is_set():
+            requeued = await db(MaintenanceJobs.requeue_running)
+            if requeued:
+                print(f"{requeued} unterbrochene Aufträge erneut eingeplant", flush=True)
+            queued = await db(roll_forward, horizon_days)
+            removed = await db(_cleanup)
+            print(f"Horizont fortgerollt: {queued} Aufträge angelegt, {removed} alte Aufträge entfernt", flush=True)
+            if once:
+                return
+            await sleep(roll_forward_seconds)
+
+    async def job_loop():
+        while not stop.is_set():
+            processed = await db(process_batch, batch_size, horizon_days)
+            if processed:
+                print(f"{processed} Aufträge bearbeitet", flush=True)
+            elif once:
+                return
+            else:
+                await sleep(poll_seconds)
+
+    if once:
+        await roll_forward_loop()
+        await job_loop()
+    else:
+        await asyncio.gather(roll_forward_loop(), job_loop())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--once", action="store_true", help="offene Aufträge abarbeiten und beenden")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Aufträge je Schreibvorgang")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="Sekunden zwischen zwei Abfragen")
+    parser.add_argument("--roll-forward", type=float, default=ROLL_FORWARD_SECONDS,
+                        help="Sekunden zwischen zwei Prüfungen des Horizonts")
+    parser.add_argument("--horizon-days", type=int, default=HORIZON_DAYS, help="Planungshorizont in Tagen")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size, args.poll, args.roll_forward, args.horizon_days, args.once))
+
+
+if __name__ == "__main__":
+    main()
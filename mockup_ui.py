@@ -1,8 +1,12 @@
 import pandas as pd
 import streamlit as st
-from tinydb import TinyDB, Query
+from tinydb import Query
+import database
 from datetime import datetime, timedelta, date
 import json
+from recurrence import MaintenanceRule
+from cost_aggregates import MaintenanceCosts
+from indexes import HashIndex
 
 # Custom JSON encoder for datetime and date
 class DateTimeEncoder(json.JSONEncoder):
@@ -11,11 +15,34 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-# Initialize database
-db = TinyDB('device_management_db.json')
-users_table = db.table('users')
-devices_table = db.table('devices')
-reservations_table = db.table('reservations')
+# Tables of the shared database
+users_table = database.table('users')
+devices_table = database.table('devices')
+reservations_table = database.table('reservations')
+maintenance_rules_table = database.table('maintenance_rules')
+
+
+# Cost aggregates survive reruns; creating and removing devices update them incrementally
+@st.cache_resource
+def maintenance_costs():
+    costs = MaintenanceCosts(devices_table.all, user_field='responsible_person')
+    database.on_external_change(costs.invalidate)
+    return costs
+
+
+# Reverse foreign-key indexes (device doc_id -> reservation / rule doc_ids) for cascade deletes
+@st.cache_resource
+def reservations_by_device():
+    index = HashIndex(reservations_table, 'device_id')
+    database.on_external_change(index.invalidate)
+    return index
+
+
+@st.cache_resource
+def maintenance_rules_by_device():
+    index = HashIndex(maintenance_rules_table, 'device_id')
+    database.on_external_change(index.invalidate)
+    return index
 
 # User class
 class User:
@@ -50,24 +77,20 @@ class Device:
         return (365 / self.maintenance_interval) * self.maintenance_cost
 
     def reserve_maintenance_dates(self):
-        current_date = self.first_maintenance
-        while current_date <= datetime.now().date():
-            reservations_table.insert({
-                "device_id": self.id,
-                "reserver": "Maintenance",  # Reserved for maintenance
-                "start_date": str(current_date),
-                "end_date": str(current_date)
-            })
-            current_date += timedelta(days=self.maintenance_interval)
+        # Store the series once as a rule; occurrences are expanded on demand
+        rule = MaintenanceRule(self.first_maintenance, self.maintenance_interval, datetime.now().date())
+        doc = {"device_id": self.id, "device_name": self.name, **rule.to_dict()}
+        maintenance_rules_by_device().add(maintenance_rules_table.insert(doc), doc)
 
     def reserve_next_maintenance(self):
         if self.next_maintenance <= self.end_of_life:
-            reservations_table.insert({
+            doc = {
                 "device_id": self.id,
                 "reserver": "Maintenance",
                 "start_date": str(self.next_maintenance),
                 "end_date": str(self.next_maintenance)
-            })
+            }
+            reservations_by_device().add(reservations_table.insert(doc), doc)
 
 # Streamlit UI
 st.title("Geräte-Verwaltung an einer Hochschule")
@@ -91,7 +114,7 @@ if menu == "Nutzer-Verwaltung":
         st.dataframe(users)
 
     elif action == "Nutzer entfernen":
-        user_id = st.selectbox("Wähle Nutzer zur Entfernung", [u['id'] for u in users_table.all()])
+        user_id = st.selectbox("Wähle Nutzer zur Entfernung", [user_id for user_id, in database.project('users', ('id',))])
         if st.button("Entfernen"):
             UserQuery = Query()
             users_table.remove(UserQuery.id == user_id)
@@ -103,7 +126,7 @@ elif menu == "Geräte-Verwaltung":
 
     if action == "Gerät anlegen":
         device_name = st.text_input("Gerätename")
-        responsible_person = st.selectbox("Verantwortlicher Nutzer", [u['id'] for u in users_table.all()])
+        responsible_person = st.selectbox("Verantwortlicher Nutzer", [user_id for user_id, in database.project('users', ('id',))])
         end_of_life = st.date_input("End-of-Life Datum")
         maintenance_interval = st.number_input("Wartungsintervall (Tage)", min_value=1, step=1)
         maintenance_cost = st.number_input("Wartungskosten", min_value=0.0, step=0.1)
@@ -111,7 +134,7 @@ elif menu == "Geräte-Verwaltung":
         auto_reserve = st.checkbox("Automatische Reservierung für alle Wartungstermine")
         if st.button("Speichern"):
             device = Device(
-                id=len(devices_table) + 1,
+                id=None,
                 name=device_name,
                 responsible_person=responsible_person,
                 end_of_life=str(end_of_life),
@@ -119,7 +142,11 @@ elif menu == "Geräte-Verwaltung":
                 maintenance_interval=maintenance_interval,
                 maintenance_cost=maintenance_cost
             )
-            devices_table.insert(json.loads(json.dumps(device.__dict__, cls=DateTimeEncoder)))
+            device_data = json.loads(json.dumps(device.__dict__, cls=DateTimeEncoder))
+            # The doc_id is the device id: the cascade delete looks up reservations and rules by it
+            device.id = device_data["id"] = devices_table.insert(device_data)
+            devices_table.update({"id": device.id}, doc_ids=[device.id])
+            maintenance_costs().add(device_data)
             if auto_reserve:
                 device.reserve_maintenance_dates()
             else:
@@ -134,40 +161,50 @@ elif menu == "Geräte-Verwaltung":
         st.dataframe(devices)
 
     elif action == "Gerät entfernen":
-        device_id = st.selectbox("Wähle Gerät zur Entfernung", [d.doc_id for d in devices_table.all()])
+        device_id = st.selectbox("Wähle Gerät zur Entfernung", [int(doc_id) for doc_id in database.read_table('devices')])
         if st.button("Entfernen"):
+            maintenance_costs().discard(devices_table.get(doc_id=device_id))
             devices_table.remove(doc_ids=[device_id])
-            st.success("Gerät wurde erfolgreich entfernt.")
+            # Cascade: one remove per table with the doc_ids from the reverse indexes
+            reservation_ids = reservations_by_device().pop(device_id)
+            if reservation_ids:
+                reservations_table.remove(doc_ids=reservation_ids)
+            rule_ids = maintenance_rules_by_device().pop(device_id)
+            if rule_ids:
+                maintenance_rules_table.remove(doc_ids=rule_ids)
+            st.success(f"Gerät wurde mit {len(reservation_ids)} Reservierung(en) erfolgreich entfernt.")
 
 elif menu == "Reservierungssystem":
     st.header("Reservierungssystem")
     action = st.radio("Aktion", ["Reservierung eintragen", "Reservierungen anzeigen", "Reservierung entfernen"])
 
     if action == "Reservierung eintragen":
-        device_id = st.selectbox("Gerät", [d.doc_id for d in devices_table.all()])
-        reserver = st.selectbox("Reservierer", [u['id'] for u in users_table.all()])
+        device_id = st.selectbox("Gerät", [int(doc_id) for doc_id in database.read_table('devices')])
+        reserver = st.selectbox("Reservierer", [user_id for user_id, in database.project('users', ('id',))])
         start_date = st.date_input("Reservierungsbeginn")
         end_date = st.date_input("Reservierungsende")
         if st.button("Speichern"):
-            reservations_table.insert({
+            doc = {
                 "device_id": device_id,
                 "reserver": reserver,
                 "start_date": str(start_date),
                 "end_date": str(end_date)
-            })
+            }
+            reservations_by_device().add(reservations_table.insert(doc), doc)
             st.success("Reservierung wurde erfolgreich eingetragen.")
 
     elif action == "Reservierungen anzeigen":
         reservations = pd.DataFrame(reservations_table.all())
         if not reservations.empty and 'device_id' in reservations.columns:
-            reservations['Gerät'] = reservations['device_id'].apply(
-                lambda x: devices_table.get(doc_id=x)['name'] if devices_table.get(doc_id=x) else "Unbekannt"
-            )
+            # Hash join: one pass over devices, one vectorized lookup per reservation
+            device_names = {d.doc_id: d.get('name') for d in devices_table.all()}
+            reservations['Gerät'] = reservations['device_id'].map(device_names).fillna("Unbekannt")
         st.dataframe(reservations)
 
     elif action == "Reservierung entfernen":
-        reservation_id = st.selectbox("Wähle Reservierung zur Entfernung", [r.doc_id for r in reservations_table.all()])
+        reservation_id = st.selectbox("Wähle Reservierung zur Entfernung", [int(doc_id) for doc_id in database.read_table('reservations')])
         if st.button("Entfernen"):
+            reservations_by_device().discard(reservation_id, reservations_table.get(doc_id=reservation_id))
             reservations_table.remove(doc_ids=[reservation_id])
             st.success("Reservierung wurde erfolgreich entfernt.")
 
@@ -176,15 +213,27 @@ elif menu == "Wartungs-Management":
     action = st.radio("Aktion", ["Wartungen anzeigen", "Wartungskosten anzeigen"])
 
     if action == "Wartungen anzeigen":
-        reservations = pd.DataFrame(reservations_table.all())
+        # Rules are expanded only within the selected window, not up to their end
+        col_start, col_end = st.columns(2)
+        window_start = col_start.date_input("Von", date.today())
+        window_end = col_end.date_input("Bis", date.today() + timedelta(days=90))
+        reservations = pd.DataFrame([
+            r for r in reservations_table.all()
+            if r.get("start_date", "") <= str(window_end) and r.get("end_date", "") >= str(window_start)
+        ] + [
+            {"device_id": r["device_id"], "reserver": "Maintenance", "start_date": str(d), "end_date": str(d)}
+            for r in maintenance_rules_table.all() if "device_id" in r
+            for d in MaintenanceRule.from_dict(r).occurrences(window_start, window_end)
+        ])
         if not reservations.empty and 'device_id' in reservations.columns:
-            maintenance_reservations = reservations[reservations['reserver'] == "Maintenance"]
-            maintenance_reservations['Gerät'] = maintenance_reservations['device_id'].apply(
-                lambda x: devices_table.get(doc_id=x)['name'] if devices_table.get(doc_id=x) else "Unbekannt"
-            )
+            maintenance_reservations = reservations[reservations['reserver'] == "Maintenance"].copy()
+            device_names = {d.doc_id: d.get('name') for d in devices_table.all()}
+            maintenance_reservations['Gerät'] = maintenance_reservations['device_id'].map(device_names).fillna("Unbekannt")
             st.dataframe(maintenance_reservations)
 
     elif action == "Wartungskosten anzeigen":
-        devices = devices_table.all()
-        total_cost = sum(d.get('maintenance_cost', 0.0) for d in devices)
-        st.write(f"Gesamtkosten für die nächste Wartung: {total_cost:.2f} EUR")
+        costs = maintenance_costs()
+        st.write(f"Gesamtkosten für die nächste Wartung: {costs.next_maintenance_total():.2f} EUR")
+        st.write(f"Wartungskosten pro Jahr: {costs.total():.2f} EUR")
+        st.dataframe(pd.DataFrame({"Kosten pro Jahr": costs.by_user()}))
+        st.bar_chart(pd.DataFrame({"Kosten": costs.by_month()}, index=range(1, 13)))
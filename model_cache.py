@@ -0,0 +1,69 @@
+import functools
+import threading
+from collections import OrderedDict
+import database
+
+# Versionszähler je Tabelle; jeder Schreibvorgang der Modelle erhöht den Zähler seiner Tabelle
+_versions = {}
+# Wird erhöht, wenn ein anderer Prozess die Datenbankdatei geändert hat
+_epoch = 0
+_lock = threading.Lock()
+
+
+def bump(*tables):
+    """Markiert die gecachten Lesezugriffe auf diese Tabellen als veraltet."""
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def _bump_epoch():
+    global _epoch
+    with _lock:
+        _epoch += 1
+
+
+database.on_external_change(_bump_epoch)
+
+
+def version(table):
+    return _versions.get(table, 0)
+
+
+def cached(*tables, maxsize=128):
+    """Cacht das Ergebnis einer Lesefunktion, bis eine der `tables` geschrieben wird.
+
+    Entspricht `st.cache_data`, ist aber unabhängig von Streamlit und wird nicht
+    zeitgesteuert, sondern über die Versionszähler invalidiert. Die Ergebnisse
+    werden zwischen Aufrufen geteilt und dürfen nicht verändert werden.
+
+    Mit der SQLite-Engine wird nicht gecacht: deren Schreibvorgänge (auch die anderer
+    Prozesse) erhöhen keine Versionszähler, auch geerbte Lesefunktionen lesen dort immer neu.
+    """
+    def decorator(func):
+        entries = OrderedDict()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if database.DB_ENGINE == 'sqlite':
+                return func(*args, **kwargs)
+            database.refresh()
+            versions = (_epoch,) + tuple(_versions.get(table, 0) for table in tables)
+            key = (args, tuple(sorted(kwargs.items())))
+            try:
+                hit = entries.get(key)
+            except TypeError:
+                return func(*args, **kwargs)
+            if hit is not None and hit[0] == versions:
+                entries.move_to_end(key)
+                return hit[1]
+            value = func(*args, **kwargs)
+            entries[key] = (versions, value)
+            entries.move_to_end(key)
+            while len(entries) > maxsize:
+                entries.popitem(last=False)
+            return value
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+    return decorator
@@ -0,0 +1,18 @@
+import database
+import instrumentation
+from devices import ReservationConflictError
+from users import UserHasDevicesError
+
+# Modellklassen der konfigurierten Engine (DEVICE_DB_ENGINE)
+if database.DB_ENGINE == 'sqlite':
+    from sqlite_engine import SQLiteDevice as Device, SQLiteUser as User, SQLiteMaintenanceJobs as MaintenanceJobs
+elif database.DB_ENGINE == 'tinydb':
+    from devices import Device
+    from users import User
+    from maintenance_jobs import MaintenanceJobs
+else:
+    raise ValueError(f"Unbekannte Datenbank-Engine: {database.DB_ENGINE}")
+
+if instrumentation.ENABLED:
+    instrumentation.instrument_class(Device)
+    instrumentation.instrument_class(User)
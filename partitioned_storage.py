@@ -0,0 +1,432 @@
+"""Storage mit einer Datei je Tabelle und Monatspartitionen für Reservierungen.
+
+Aufbau des Verzeichnisses (Pfad der Datenbankdatei ohne Endung):
+
+    device_management_db/
+        manifest.json                   Tabellen, Partitionen und Archiv
+        users.json, devices.json, ...   eine Datei je Tabelle
+        reservations/2025-03.json       Reservierungen nach Monat des Startdatums
+        reservations/2023-11.json.gz    archivierter Monat (komprimiert, schreibgeschützt)
+
+Ein Schreibvorgang ersetzt nur die Dateien, deren Inhalt sich geändert hat, das
+Hinzufügen einer Reservierung also nur den betroffenen Monat. Monate, deren
+Reservierungen alle in der Vergangenheit liegen, lassen sich archivieren; sie
+gehören dann nicht mehr zum Arbeitsbestand und werden nur noch gezielt über
+`read_archived` gelesen, wobei das Manifest Monate außerhalb des Zeitraums ausschließt.
+Ebenso liest `read_range` für Abfragen mit Zeitraum nur die Monate des Arbeitsbestands,
+die ihn überlappen können. Archivierte Dokumente gelöschter Geräte entfernt
+`remove_archived`, dafür werden die betroffenen Archivdateien neu geschrieben.
+
+Archivieren (gleiche Umgebungsvariablen wie die Oberfläche, DEVICE_DB_STORAGE=partitioned):
+    python partitioned_storage.py archive                  # Monate, die vor 12 Monaten endeten
+    python partitioned_storage.py archive --before 2025-01-01
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+from datetime import date
+from tinydb.storages import Storage
+from journal_storage import _file_stamp
+
+# Partitionierte Tabellen: Tabelle -> (Feld für den Monat, Feld für das Ende)
+PARTITIONED_TABLES = {'reservations': ('start_date', 'end_date')}
+# Partition für Dokumente ohne gültiges Datum; wird nie archiviert
+UNDATED = 'undated'
+ARCHIVE_MONTHS = 12
+
+_MONTH = re.compile(r'\d{4}-\d{2}$')
+_UNLOADED = object()
+
+
+def _write_file(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class PartitionTables(dict):
+    """Tabellen aus `PartitionedStorage.read()`; eine Tabelle wird erst beim ersten Zugriff gelesen.
+
+    TinyDB greift nur über `[]`, `in` und die Tabellennamen zu; `values()` und
+    `items()` liefern für ungelesene Tabellen einen Platzhalter.
+    """
+
+    def __init__(self, storage, names):
+        super().__init__(dict.fromkeys(names, _UNLOADED))
+        self._storage = storage
+
+    def __getitem__(self, name):
+        docs = super().__getitem__(name)
+        if docs is _UNLOADED:
+            docs = self._storage.read_table(name)
+            super().__setitem__(name, docs)
+        return docs
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+
+class PartitionedStorage(Storage):
+    """TinyDB-Storage, der jede Tabelle in eine eigene Datei und `PARTITIONED_TABLES` nach Monaten aufteilt.
+
+    Ob sich eine Datei geändert hat, wird mit einer Kopie der Dokumente vom letzten Lesen
+    bzw. Schreiben verglichen (TinyDB ändert Dokumente an Ort und Stelle). Neue
+    Inhalte werden erst vollständig als `.tmp` geschrieben und dann ersetzt, zuletzt das
+    Manifest. Andere Prozesse erkennen Änderungen am Manifest und lesen nur die Dateien
+    neu, deren Version sich geändert hat.
+
+    Gibt es das Verzeichnis noch nicht, wird eine vorhandene JSON-Datei unter `path`
+    einmalig übernommen (sie selbst bleibt unverändert).
+    """
+
+    def __init__(self, path, encoding='utf-8'):
+        self.directory = os.path.splitext(path)[0]
+        self.manifest_path = os.path.join(self.directory, 'manifest.json')
+        self.on_reload = None
+        self._encoding = encoding
+        self._manifest = None
+        self._manifest_stamp = None
+        self._tables = {}   # Tabelle -> {doc_id: dokument} (Arbeitsbestand)
+        self._parts = {}    # (Tabelle, Partition oder None) -> {doc_id: dokument}
+        self._snapshots = {}  # (Tabelle, Partition oder None) -> Kopie der Dokumente wie in der Datei
+        if not os.path.exists(self.manifest_path):
+            self._create(path)
+
+    def _create(self, path):
+        os.makedirs(self.directory, exist_ok=True)
+        data = {}
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, encoding=self._encoding) as f:
+                data = json.load(f)
+        self._manifest = {'serial': 0, 'tables': {}}
+        self._commit(*self._changes(data))
+
+    # -- Dateien und Manifest ----------------------------------------------------
+
+    def _path(self, name, partition=None, archived=False):
+        if partition is None:
+            return os.path.join(self.directory, name + '.json')
+        return os.path.join(self.directory, name, partition + ('.json.gz' if archived else '.json'))
+
+    def _versions(self):
+        versions = {}
+        for name, entry in self._manifest['tables'].items():
+            if name in PARTITIONED_TABLES:
+                for partition, info in entry.get('partitions', {}).items():
+                    versions[name, partition] = info['version']
+            else:
+                versions[name, None] = entry['version']
+        return versions
+
+    def _check_manifest(self):
+        """Übernimmt ein von einem anderen Prozess geschriebenes Manifest und meldet das."""
+        stamp = _file_stamp(self.manifest_path)
+        if stamp == self._manifest_stamp and self._manifest is not None:
+            return
+        old = self._versions() if self._manifest is not None else None
+        with open(self.manifest_path, encoding=self._encoding) as f:
+            self._manifest = json.load(f)
+        self._manifest_stamp = stamp
+        if old is None:
+            return
+        versions = self._versions()
+        # Auch neue und entfernte Partitionen: die Tabelle wird dann neu zusammengesetzt
+        for key in old.keys() | versions.keys():
+            if old.get(key) != versions.get(key):
+                self._forget(*key)
+        if self.on_reload:
+            self.on_reload()
+
+    def _forget(self, name, partition=None):
+        self._parts.pop((name, partition), None)
+        self._snapshots.pop((name, partition), None)
+        self._tables.pop(name, None)
+
+    def _load_part(self, name, partition=None):
+        key = (name, partition)
+        if key not in self._parts:
+            with open(self._path(name, partition), encoding=self._encoding) as f:
+                docs = json.load(f)
+            self._snapshots[key] = {doc_id: dict(doc) for doc_id, doc in docs.items()}
+            self._parts[key] = docs
+        return self._parts[key]
+
+    def _read_archive(self, name, partition):
+        with gzip.open(self._path(name, partition, archived=True), 'rt', encoding=self._encoding) as f:
+            return json.load(f)
+
+    def _stage(self, staged, name, partition, docs, info):
+        """Schreibt `docs` als `.tmp`, falls sich der Inhalt geändert hat; vermerkt die neue Version in `info`.
+
+        Gibt zurück, ob die Datei neu geschrieben wird.
+        """
+        key = (name, partition)
+        self._parts[key] = docs
+        if self._snapshots.get(key) == docs:
+            return False
+        path = self._path(name, partition)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_file(path + '.tmp', json.dumps(docs).encode(self._encoding))
+        staged.append((path + '.tmp', path))
+        info['version'] = self._manifest['serial'] + 1
+        self._snapshots[key] = {doc_id: dict(doc) for doc_id, doc in docs.items()}
+        return True
+
+    def _changes(self, data):
+        """Schreibt die geänderten Dateien von `data` als `.tmp`; gibt (zu ersetzende, zu löschende) Dateien zurück."""
+        tables = self._manifest['tables']
+        staged, removed = [], []
+        for name in [name for name in tables if name not in data]:
+            removed.extend(self._files(name))
+            del tables[name]
+            for key in [key for key in self._parts if key[0] == name]:
+                self._forget(*key)
+            self._tables.pop(name, None)
+        for name, docs in dict.items(data):
+            if docs is _UNLOADED or docs is self._tables.get(name):
+                continue
+            entry = tables.setdefault(name, {'version': 0})
+            if name in PARTITIONED_TABLES:
+                groups = self._group(docs, PARTITIONED_TABLES[name][0])
+                partitions = entry.setdefault('partitions', {})
+                for partition in [p for p in partitions if p not in groups]:
+                    removed.append(self._path(name, partition))
+                    del partitions[partition]
+                    self._forget(name, partition)
+                for partition, part_docs in groups.items():
+                    info = partitions.setdefault(partition, {'version': 0})
+                    if self._stage(staged, name, partition, part_docs, info):
+                        info['max_end'] = self._max_end(part_docs, *PARTITIONED_TABLES[name])
+            else:
+                self._stage(staged, name, None, docs, entry)
+            self._tables[name] = docs
+        return staged, removed
+
+    @staticmethod
+    def _group(docs, field):
+        """Teilt `docs` nach dem Monat (`JJJJ-MM`) von `field` auf; ohne gültiges Datum nach `UNDATED`."""
+        groups = {}
+        for doc_id, doc in docs.items():
+            month = doc.get(field)
+            month = month[:7] if isinstance(month, str) else UNDATED
+            group = groups.get(month)
+            if group is None:
+                group = groups[month] = {}
+            group[doc_id] = doc
+        for month in [month for month in groups if month != UNDATED and not _MONTH.match(month)]:
+            groups.setdefault(UNDATED, {}).update(groups.pop(month))
+        return groups
+
+    @staticmethod
+    def _max_end(docs, start_field, end_field):
+        """Spätestes Ende (ersatzweise Beginn) der Dokumente als ISO-String, für das Ausschließen von Monaten."""
+        return max((str(doc.get(end_field) or doc.get(start_field)) for doc in docs.values()), default='')
+
+    def _files(self, name):
+        entry = self._manifest['tables'][name]
+        if name not in PARTITIONED_TABLES:
+            return [self._path(name)]
+        return ([self._path(name, p) for p in entry.get('partitions', {})]
+                + [self._path(name, p, archived=True) for p in entry.get('archive', {})])
+
+    def _commit(self, staged, removed):
+        """Ersetzt die vorbereiteten Dateien, schreibt das Manifest und löscht nicht mehr benötigte Dateien."""
+        for tmp_path, path in staged:
+            os.replace(tmp_path, path)
+        self._manifest['serial'] += 1
+        tmp_path = self.manifest_path + '.tmp'
+        _write_file(tmp_path, json.dumps(self._manifest).encode(self._encoding))
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest_stamp = _file_stamp(self.manifest_path)
+        for path in removed:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # -- Storage-Schnittstelle --------------------------------------------------
+
+    def read(self):
+        self._check_manifest()
+        if not self._manifest['tables']:
+            return None
+        tables = PartitionTables(self, self._manifest['tables'])
+        for name, docs in self._tables.items():
+            dict.__setitem__(tables, name, docs)
+        return tables
+
+    def read_table(self, name):
+        """Die Dokumente der Tabelle `name` im Arbeitsbestand (nicht verändern); liest nur deren Dateien."""
+        self._check_manifest()
+        entry = self._manifest['tables'].get(name)
+        if entry is None:
+            return None
+        if name not in self._tables:
+            if name in PARTITIONED_TABLES:
+                docs = {}
+                for partition in sorted(entry.get('partitions', {})):
+                    docs.update(self._load_part(name, partition))
+            else:
+                docs = self._load_part(name)
+            self._tables[name] = docs
+        return self._tables[name]
+
+    def read_range(self, name, start_date=None, end_date=None):
+        """Die Dokumente von `name` aus den Monaten des Arbeitsbestands, die [start_date, end_date] überlappen können.
+
+        Nur diese Dateien werden gelesen; die Dokumente sind nicht nach dem Zeitraum gefiltert
+        (nicht verändern). `None`, wenn die Tabelle nicht partitioniert oder ohnehin schon
+        ganz gelesen ist; dann ist `read_table` der günstigere Weg.
+        """
+        self._check_manifest()
+        entry = self._manifest['tables'].get(name)
+        if name not in PARTITIONED_TABLES or entry is None or name in self._tables:
+            return None
+        docs = {}
+        for partition, info in sorted(entry.get('partitions', {}).items()):
+            if partition != UNDATED:
+                if end_date is not None and partition > str(end_date)[:7]:
+                    continue
+                # Partitionen aus älteren Manifesten ohne `max_end` werden immer gelesen
+                if start_date is not None and info.get('max_end', '9999') < str(start_date)[:10]:
+                    continue
+            docs.update(self._load_part(name, partition))
+        return docs
+
+    def write(self, data):
+        self._check_manifest()
+        manifest = json.dumps(self._manifest)
+        try:
+            staged, removed = self._changes(data or {})
+            if staged or removed or json.dumps(self._manifest) != manifest:
+                self._commit(staged, removed)
+        except Exception:
+            # Manifest im Speicher ist evtl. schon geändert: beim nächsten Zugriff neu lesen
+            self._manifest = None
+            self.invalidate()
+            raise
+
+    def refresh(self):
+        """Prüft, ob ein anderer Prozess das Manifest geändert hat; neu gelesen wird erst beim nächsten Zugriff."""
+        self._check_manifest()
+
+    def invalidate(self):
+        """Verwirft alle gelesenen Tabellen; sie werden beim nächsten Zugriff neu gelesen."""
+        self._tables, self._parts, self._snapshots = {}, {}, {}
+
+    # -- Archiv -----------------------------------------------------------------
+
+    def archive(self, before):
+        """Verschiebt alle Monate, deren Dokumente vor `before` enden, in komprimierte, schreibgeschützte Dateien.
+
+        Ein Monat, der schon archiviert ist, wird mit den neuen Dokumenten zusammengeführt.
+        Gibt die archivierten Partitionen als `tabelle/monat` zurück.
+        """
+        self._check_manifest()
+        before = str(before)[:10]
+        archived, staged, removed = [], [], []
+        for name, (start_field, end_field) in PARTITIONED_TABLES.items():
+            entry = self._manifest['tables'].get(name)
+            if entry is None:
+                continue
+            partitions = entry.get('partitions', {})
+            archive = entry.setdefault('archive', {})
+            for partition in sorted(partitions):
+                if partition == UNDATED or partition >= before[:7]:
+                    continue
+                docs = self._load_part(name, partition)
+                max_end = self._max_end(docs, start_field, end_field)
+                if max_end >= before:
+                    continue
+                if partition in archive:
+                    docs = {**self._read_archive(name, partition), **docs}
+                    max_end = max(max_end, archive[partition]['max_end'])
+                self._stage_archive(staged, name, partition, docs)
+                archive[partition] = {'count': len(docs), 'max_end': max_end,
+                                      'max_id': max((int(doc_id) for doc_id in docs), default=0)}
+                del partitions[partition]
+                removed.append(self._path(name, partition))
+                self._forget(name, partition)
+                archived.append(f"{name}/{partition}")
+        if archived:
+            self._commit(staged, removed)
+        return archived
+
+    def _stage_archive(self, staged, name, partition, docs):
+        path = self._path(name, partition, archived=True)
+        _write_file(path + '.tmp', gzip.compress(json.dumps(docs).encode(self._encoding)))
+        os.chmod(path + '.tmp', 0o444)
+        staged.append((path + '.tmp', path))
+
+    def remove_archived(self, name, field, values):
+        """Entfernt die archivierten Dokumente von `name`, deren `field` in `values` liegt; gibt ihre Anzahl zurück.
+
+        Dafür werden alle Archivdateien der Tabelle gelesen und die betroffenen neu
+        geschrieben. Die höchste doc_id eines Monats bleibt im Manifest, damit sie nicht
+        erneut vergeben wird.
+        """
+        self._check_manifest()
+        values = set(values)
+        archive = self._manifest['tables'].get(name, {}).get('archive', {})
+        if not values or not archive:
+            return 0
+        staged, count = [], 0
+        for partition, info in sorted(archive.items()):
+            docs = self._read_archive(name, partition)
+            kept = {doc_id: doc for doc_id, doc in docs.items() if doc.get(field) not in values}
+            if len(kept) == len(docs):
+                continue
+            self._stage_archive(staged, name, partition, kept)
+            info['count'] = len(kept)
+            info['max_end'] = self._max_end(kept, *PARTITIONED_TABLES[name])
+            count += len(docs) - len(kept)
+        if staged:
+            self._commit(staged, [])
+        return count
+
+    def read_archived(self, name, start_date=None, end_date=None):
+        """Archivierte Dokumente von `name` aus den Monaten, die [start_date, end_date] überlappen können.
+
+        Nur diese Archivdateien werden gelesen; die Dokumente sind nicht nach dem Zeitraum gefiltert.
+        """
+        self._check_manifest()
+        entry = self._manifest['tables'].get(name, {})
+        docs = []
+        for partition, info in sorted(entry.get('archive', {}).items()):
+            if end_date is not None and partition > str(end_date)[:7]:
+                continue
+            if start_date is not None and info['max_end'] < str(start_date)[:10]:
+                continue
+            docs.extend(self._read_archive(name, partition).values())
+        return docs
+
+    def id_floor(self, name):
+        """Höchste doc_id der archivierten Dokumente von `name`; neue Dokumente müssen darüber liegen."""
+        self._check_manifest()
+        archive = self._manifest['tables'].get(name, {}).get('archive', {})
+        return max((info['max_id'] for info in archive.values()), default=0)
+
+
+def _months_ago(today, months):
+    month = today.year * 12 + today.month - 1 - months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archiviert vergangene Reservierungsmonate")
+    parser.add_argument("command", choices=("archive",))
+    parser.add_argument("--before", type=date.fromisoformat,
+                        help=f"Stichtag (Standard: Monatsanfang vor {ARCHIVE_MONTHS} Monaten)")
+    args = parser.parse_args()
+
+    import database
+    if database.DB_STORAGE != 'partitioned':
+        raise SystemExit("Archivieren erfordert DEVICE_DB_STORAGE=partitioned")
+    before = args.before or _months_ago(date.today(), ARCHIVE_MONTHS)
+    archived = database.archive(before)
+    print(f"{len(archived)} Monate vor {before} archiviert" + (f" ({archived[0]} bis {archived[-1]})" if archived else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from datetime import date, datetime, timedelta
+
+
+def to_date(value):
+    """Wandelt ein Datum, einen Zeitstempel oder einen ISO-String in ein `date` um."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class MaintenanceRule:
+    """Wiederkehrende Wartung eines Geräts: Start, Intervall (Tage), Ende und Ausnahmen.
+
+    Einzelne Termine werden nie gespeichert, sondern bei Bedarf nur für das
+    angefragte Zeitfenster berechnet.
+    """
+
+    def __init__(self, start, interval, end, exceptions=None):
+        self.start = to_date(start)
+        self.interval = int(interval)
+        self.end = to_date(end)
+        self.exceptions = {to_date(d) for d in (exceptions or [])}
+
+    def _first_index(self, day):
+        """Index des ersten Termins an oder nach `day`."""
+        if day <= self.start:
+            return 0
+        return -(-(day - self.start).days // self.interval)
+
+    def occurrences(self, window_start=None, window_end=None):
+        """Erzeugt alle Termine im Fenster [window_start, window_end] (jeweils inklusive)."""
+        window_start = self.start if window_start is None else max(self.start, to_date(window_start))
+        window_end = self.end if window_end is None else min(self.end, to_date(window_end))
+        if self.interval < 1 or window_start > window_end:
+            return
+        current_date = self.start + timedelta(days=self._first_index(window_start) * self.interval)
+        step = timedelta(days=self.interval)
+        while current_date <= window_end:
+            if current_date not in self.exceptions:
+                yield current_date
+            current_date += step
+
+    def count(self, window_start=None, window_end=None):
+        """Anzahl der Termine im Fenster, ohne sie einzeln zu erzeugen."""
+        window_start = self.start if window_start is None else max(self.start, to_date(window_start))
+        window_end = self.end if window_end is None else min(self.end, to_date(window_end))
+        if self.interval < 1 or window_start > window_end:
+            return 0
+        first = self._first_index(window_start)
+        last = (window_end - self.start).days // self.interval
+        excluded = sum(1 for d in self.exceptions if window_start <= d <= window_end and self.occurs_on_grid(d))
+        return max(last - first + 1, 0) - excluded
+
+    def occurs_on_grid(self, day):
+        """Prüft, ob `day` auf dem Raster der Regel liegt (Ausnahmen unberücksichtigt)."""
+        return self.start <= day <= self.end and (day - self.start).days % self.interval == 0
+
+    def occurs_on(self, day):
+        """Prüft, ob an `day` ein (nicht ausgenommener) Termin liegt."""
+        day = to_date(day)
+        return self.interval >= 1 and self.occurs_on_grid(day) and day not in self.exceptions
+
+    def to_dict(self):
+        return {
+            "start": str(self.start),
+            "interval": self.interval,
+            "end": str(self.end),
+            "exceptions": sorted(str(d) for d in self.exceptions),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["start"], data["interval"], data["end"], data.get("exceptions"))
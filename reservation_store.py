@@ -0,0 +1,211 @@
+import sys
+from datetime import date
+import numpy as np
+from recurrence import to_date
+
+# `date.toordinal()` von 1970-01-01, um `datetime64[D]` in Ordinalzahlen umzurechnen
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _ordinals(values):
+    """Wandelt ISO-Datumsstrings (oder `date`) vektorisiert in int32-Ordinalzahlen um."""
+    days = np.array([str(v)[:10] for v in values], dtype='datetime64[D]').astype(np.int64)
+    return (days + _EPOCH_ORDINAL).astype(np.int32)
+
+
+def _intern(values):
+    """Sortierte, internierte Werte und je Eintrag der Index darin (None sortiert wie "")."""
+    unique = sorted(set(values), key=lambda v: (v or "", v is not None))
+    table = tuple(sys.intern(v) if isinstance(v, str) else v for v in unique)
+    position = {v: i for i, v in enumerate(table)}
+    return table, np.fromiter((position[v] for v in values), dtype=np.int32, count=len(values))
+
+
+def _sort_keys(table):
+    return np.array([v or "" for v in table], dtype=object)
+
+
+def _categorical(codes, table):
+    """Codes und Werte als `pd.Categorical`; None wird zu einem fehlenden Wert."""
+    import pandas as pd
+    if None in table:
+        missing = table.index(None)
+        codes = np.where(codes == missing, -1, codes - (codes > missing))
+        table = table[:missing] + table[missing + 1:]
+    return pd.Categorical.from_codes(codes, table)
+
+
+class ReservationColumns:
+    """Spaltenspeicher für gespeicherte Reservierungen.
+
+    Gerätenamen und Reservierer liegen einmal interniert in `names` / `reservers`,
+    jede Zeile speichert nur deren Index (int32) sowie Beginn und Ende als
+    int32-Ordinalzahlen (`date.toordinal()`). Die Zeilen sind nach
+    (Beginn, Gerät, Reservierer) sortiert, wie `query_reservations` sie liefert;
+    die Reihenfolge der internierten Werte entspricht ihrer Sortierung, sodass der
+    Index gleichzeitig als Sortierschlüssel dient.
+    """
+
+    __slots__ = ('names', 'reservers', 'device', 'reserver', 'start', 'end', 'longest',
+                 '_keys', '_name_keys', '_reserver_keys', '_date_strings')
+
+    def __init__(self, names, reservers, device, reserver, start, end):
+        order = np.lexsort((reserver, device, start))
+        self.names, self.reservers = names, reservers
+        self.device, self.reserver = device[order], reserver[order]
+        self.start, self.end = start[order], end[order]
+        self.longest = int((self.end - self.start).max()) if len(order) else 0
+        self._keys = self._key(self.start.astype(np.int64), self.device, self.reserver)
+        self._name_keys, self._reserver_keys = _sort_keys(names), _sort_keys(reservers)
+        self._date_strings = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Baut den Speicher aus Reservierungen (Dictionaries mit Gerät, Reservierer, Beginn, Ende)."""
+        rows = [r for r in rows if r.get('start_date') is not None]
+        names, device = _intern([r.get('device_name') for r in rows])
+        reservers, reserver = _intern([r.get('reserver') for r in rows])
+        return cls(names, reservers, device, reserver,
+                   _ordinals(r['start_date'] for r in rows), _ordinals(r['end_date'] for r in rows))
+
+    def _key(self, start, device, reserver):
+        return (start * (len(self.names) + 1) + device) * (len(self.reservers) + 1) + reserver
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def nbytes(self):
+        """Speicherbedarf der Spalten in Bytes (ohne die internierten Werte)."""
+        return sum(column.nbytes for column in (self.device, self.reserver, self.start, self.end, self._keys))
+
+    def _date_string(self, ordinal):
+        text = self._date_strings.get(ordinal)
+        if text is None:
+            text = self._date_strings[ordinal] = date.fromordinal(ordinal).isoformat()
+        return text
+
+    def row(self, i):
+        """Zeile `i` als Reservierungs-Dictionary."""
+        return {
+            "device_name": self.names[self.device[i]],
+            "reserver": self.reservers[self.reserver[i]],
+            "start_date": self._date_string(int(self.start[i])),
+            "end_date": self._date_string(int(self.end[i])),
+        }
+
+    def _rank(self, keys, value, side):
+        """Position von `value` in den sortierten Schlüsseln wie `bisect_left`/`bisect_right`."""
+        return int(np.searchsorted(keys, value or "", side=side))
+
+    def _code(self, table, keys, value):
+        position = self._rank(keys, value, 'left')
+        while position < len(table) and keys[position] == (value or ""):
+            if table[position] == value:
+                return position
+            position += 1
+        return -1
+
+    def device_code(self, device_name):
+        """Index von `device_name` in `names` oder -1."""
+        return self._code(self.names, self._name_keys, device_name)
+
+    def reserver_code(self, reserver):
+        """Index von `reserver` in `reservers` oder -1."""
+        return self._code(self.reservers, self._reserver_keys, reserver)
+
+    def position(self, start_date=None, after=None):
+        """Erste Zeile, die im Fenster ab `start_date` bzw. nach dem Cursor `after` liegen kann."""
+        position = 0
+        if start_date is not None:
+            # Früher beginnende Reservierungen können höchstens `longest` Tage in das Fenster ragen
+            first = to_date(start_date).toordinal() - max(self.longest, 0)
+            position = int(np.searchsorted(self._keys, self._key(first, 0, 0), side='left'))
+        if after is not None:
+            start, device_name, reserver = after
+            start = to_date(start).toordinal()
+            device = self.device_code(device_name)
+            if device < 0:
+                key, side = self._key(start, self._rank(self._name_keys, device_name, 'right'), 0), 'left'
+            else:
+                reserver_code = self.reserver_code(reserver)
+                if reserver_code < 0:
+                    key, side = self._key(start, device, self._rank(self._reserver_keys, reserver, 'right')), 'left'
+                else:
+                    key, side = self._key(start, device, reserver_code), 'right'
+            position = max(position, int(np.searchsorted(self._keys, key, side=side)))
+        return position
+
+    def stop(self, end_date=None):
+        """Zeile nach der letzten, die spätestens am `end_date` beginnt."""
+        if end_date is None:
+            return len(self)
+        return int(np.searchsorted(self.start, to_date(end_date).toordinal(), side='right'))
+
+    def select(self, start_date=None, end_date=None, device_name=None, reserver=None):
+        """Alle Zeilen, die [start_date, end_date] überlappen und zu Gerät/Reservierer passen, als Sicht."""
+        first, last = self.position(start_date), self.stop(end_date)
+        mask = np.ones(max(last - first, 0), dtype=bool)
+        if start_date is not None:
+            mask &= self.end[first:last] >= to_date(start_date).toordinal()
+        if device_name is not None:
+            mask &= self.device[first:last] == self.device_code(device_name)
+        if reserver is not None:
+            mask &= self.reserver[first:last] == self.reserver_code(reserver)
+        return ReservationView(self, np.flatnonzero(mask).astype(np.int32) + first)
+
+
+class ReservationView:
+    """Sicht auf ausgewählte Zeilen eines `ReservationColumns`-Speichers.
+
+    Verhält sich wie eine Liste von Reservierungs-Dictionaries, die erst beim Zugriff
+    erzeugt werden; die Spalten (`start`, `end`, `device_name`, `reserver`) sind als
+    Arrays direkt verfügbar.
+    """
+
+    __slots__ = ('columns', 'index')
+
+    def __init__(self, columns, index):
+        self.columns = columns
+        self.index = index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ReservationView(self.columns, self.index[i])
+        return self.columns.row(self.index[i])
+
+    def __iter__(self):
+        row = self.columns.row
+        for i in self.index:
+            yield row(i)
+
+    @property
+    def start(self):
+        """Beginn je Zeile als int32-Ordinalzahl."""
+        return self.columns.start[self.index]
+
+    @property
+    def end(self):
+        """Ende je Zeile als int32-Ordinalzahl."""
+        return self.columns.end[self.index]
+
+    @property
+    def device_name(self):
+        return np.array(self.columns.names, dtype=object)[self.columns.device[self.index]]
+
+    @property
+    def reserver(self):
+        return np.array(self.columns.reservers, dtype=object)[self.columns.reserver[self.index]]
+
+    def to_dataframe(self):
+        """Die Zeilen als pandas DataFrame (Datumsangaben als `datetime64`, Namen als Kategorien)."""
+        import pandas as pd
+        return pd.DataFrame({
+            "device_name": _categorical(self.columns.device[self.index], self.columns.names),
+            "reserver": _categorical(self.columns.reserver[self.index], self.columns.reservers),
+            "start_date": (self.start.astype(np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]'),
+            "end_date": (self.end.astype(np.int64) - _EPOCH_ORDINAL).astype('datetime64[D]'),
+        })
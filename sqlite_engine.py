@@ -0,0 +1,595 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import database
+from cost_aggregates import MaintenanceCosts
+from devices import Device, ReservationConflictError, _blocking_maintenance, _maintenance_collisions, _planned_rule
+from maintenance_jobs import MaintenanceJobs, PENDING, RUNNING, DONE, FAILED, STATUSES, STALE_AFTER, timestamp
+from recurrence import MaintenanceRule, to_date
+from users import User, release_devices
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    doc_id INTEGER PRIMARY KEY,
+    id TEXT,
+    name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_id ON users(id);
+
+CREATE TABLE IF NOT EXISTS devices (
+    doc_id INTEGER PRIMARY KEY,
+    device_name TEXT,
+    managed_by_user_id TEXT,
+    end_of_life TEXT,
+    maintenance_interval INTEGER,
+    first_maintenance TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_devices_device_name ON devices(device_name);
+CREATE INDEX IF NOT EXISTS idx_devices_managed_by_user_id ON devices(managed_by_user_id);
+
+CREATE TABLE IF NOT EXISTS reservations (
+    doc_id INTEGER PRIMARY KEY,
+    device_name TEXT,
+    reserver TEXT,
+    start_date TEXT,
+    end_date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reservations_device_name_start_date ON reservations(device_name, start_date);
+CREATE INDEX IF NOT EXISTS idx_reservations_start_date ON reservations(start_date);
+
+CREATE TABLE IF NOT EXISTS maintenance_rules (
+    doc_id INTEGER PRIMARY KEY,
+    device_name TEXT UNIQUE,
+    start TEXT,
+    interval INTEGER,
+    end TEXT,
+    exceptions TEXT
+);
+
+CREATE TABLE IF NOT EXISTS maintenance_jobs (
+    doc_id INTEGER PRIMARY KEY,
+    device_name TEXT,
+    status TEXT,
+    created TEXT,
+    finished TEXT,
+    error TEXT,
+    claimed TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_maintenance_jobs_status ON maintenance_jobs(status, doc_id);
+"""
+
+DEVICE_COLUMNS = ("device_name", "managed_by_user_id", "end_of_life", "maintenance_interval", "first_maintenance")
+RESERVATION_COLUMNS = ("device_name", "reserver", "start_date", "end_date")
+
+UPSERT_RULE = (
+    "INSERT INTO maintenance_rules (device_name, start, interval, end, exceptions) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT(device_name) DO UPDATE SET start = excluded.start, interval = excluded.interval, "
+    "end = excluded.end, exceptions = excluded.exceptions"
+)
+
+_local = threading.local()
+
+
+def connect(path=None):
+    """Öffnet eine SQLite-Verbindung im WAL-Modus und legt das Schema bei Bedarf an."""
+    connection = sqlite3.connect(path or database.SQLITE_PATH, timeout=30, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(SCHEMA)
+    # Datenbanken aus älteren Versionen haben noch keine Spalte für den Übernahmezeitpunkt
+    if "claimed" not in {row["name"] for row in connection.execute("PRAGMA table_info(maintenance_jobs)")}:
+        connection.execute("ALTER TABLE maintenance_jobs ADD COLUMN claimed TEXT")
+    return connection
+
+
+def get_connection():
+    """Gibt die Verbindung des aktuellen Threads zurück (Streamlit führt Sitzungen in Threads aus)."""
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = _local.connection = connect()
+    return connection
+
+
+def _project(table, columns, fields):
+    unknown = set(fields) - set(columns)
+    if not fields or unknown:
+        raise ValueError(f"Unbekannte Felder: {sorted(unknown)}")
+    rows = get_connection().execute(f"SELECT {', '.join(fields)} FROM {table} ORDER BY doc_id")
+    return [row[0] for row in rows] if len(fields) == 1 else [tuple(row) for row in rows]
+
+
+class _Transaction:
+    """`BEGIN IMMEDIATE` ... `COMMIT`, damit Prüfung und Schreiben nicht von anderen Sitzungen unterbrochen werden."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class SQLiteDevice(Device):
+    """`Device` mit derselben Schnittstelle, gespeichert in SQLite statt TinyDB."""
+
+    __slots__ = ()
+
+    def store_data(self):
+        """Speichert das Gerät in der Datenbank."""
+        get_connection().execute(
+            f"INSERT INTO devices ({', '.join(DEVICE_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+            [getattr(self, column) for column in DEVICE_COLUMNS]
+        )
+
+    @staticmethod
+    def _check_available(connection, device_name, start_date, end_date, reserver=None):
+        if not SQLiteDevice._is_available(connection, device_name, start_date, end_date, reserver):
+            raise ReservationConflictError(f"{device_name} ist von {start_date} bis {end_date} bereits reserviert.")
+
+    def add_reservation(self, reserver, start_date, end_date):
+        """Fügt eine Reservierung für das Gerät hinzu (mit Überschneidungsprüfung)."""
+        with _Transaction(get_connection()) as connection:
+            self._check_available(connection, self.device_name, start_date, end_date, reserver)
+            connection.execute(
+                "INSERT INTO reservations (device_name, reserver, start_date, end_date) VALUES (?, ?, ?, ?)",
+                (self.device_name, reserver, str(start_date), str(end_date))
+            )
+
+    def add_reservations(self, reservations):
+        """Fügt mehrere Reservierungen in einer Transaktion hinzu."""
+        with _Transaction(get_connection()) as connection:
+            for reserver, start_date, end_date in reservations:
+                self._check_available(connection, self.device_name, start_date, end_date, reserver)
+                connection.execute(
+                    "INSERT INTO reservations (device_name, reserver, start_date, end_date) VALUES (?, ?, ?, ?)",
+                    (self.device_name, reserver, str(start_date), str(end_date))
+                )
+
+    def _rule_params(self):
+        rule = self.maintenance_rule().to_dict()
+        return self.device_name, rule["start"], rule["interval"], rule["end"], json.dumps(rule["exceptions"])
+
+    def store_maintenance_rule(self):
+        """Speichert die Wartung einmalig als Regel statt als einzelne Reservierungen."""
+        get_connection().execute(UPSERT_RULE, self._rule_params())
+
+    @classmethod
+    def store_many(cls, devices, maintenance_rules=False):
+        """Speichert mehrere Geräte in einer Transaktion, optional mit ihren Wartungsregeln."""
+        devices = list(devices)
+        with _Transaction(get_connection()) as connection:
+            connection.executemany(
+                f"INSERT INTO devices ({', '.join(DEVICE_COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                ([getattr(device, column) for column in DEVICE_COLUMNS] for device in devices)
+            )
+            if maintenance_rules:
+                connection.executemany(UPSERT_RULE, (cls(**device.to_dict())._rule_params() for device in devices))
+
+    @classmethod
+    def extend_maintenance_rules(cls, devices, until):
+        """Legt die Wartungsregeln an bzw. verlängert sie bis `until`, in einer Transaktion.
+
+        Kollisionen mit bestehenden Reservierungen werden wie in `Device.extend_maintenance_rules`
+        als Ausnahmen eingetragen und zurückgegeben.
+        """
+        collisions = []
+        with _Transaction(get_connection()) as connection:
+            for device in devices:
+                rule = device.maintenance_rule(until)
+                stored = cls._rule_from_connection(connection, device.device_name)
+                if stored is not None and stored.end >= rule.end:
+                    continue
+                window_start = rule.start if stored is None else max(rule.start, stored.end + timedelta(days=1))
+                if stored is not None:
+                    rule.exceptions = set(stored.exceptions)
+                found = _maintenance_collisions(device.device_name, rule, window_start, connection.execute(
+                    "SELECT start_date, end_date, reserver FROM reservations "
+                    "WHERE device_name = ? AND start_date <= ? AND end_date >= ? ORDER BY start_date",
+                    (device.device_name, str(rule.end), str(window_start))
+                )) if window_start <= rule.end else []
+                rule.exceptions.update(to_date(collision["date"]) for collision in found)
+                collisions += found
+                rule = rule.to_dict()
+                connection.execute(UPSERT_RULE, (device.device_name, rule["start"], rule["interval"], rule["end"],
+                                                 json.dumps(rule["exceptions"])))
+        return collisions
+
+    @classmethod
+    def add_many_reservations(cls, reservations):
+        """Fügt Reservierungen beliebiger Geräte in einer Transaktion hinzu (siehe `Device.add_many_reservations`)."""
+        rejected = []
+        with _Transaction(get_connection()) as connection:
+            for reservation in reservations:
+                device_name, reserver, start_date, end_date = reservation
+                if not cls._is_available(connection, device_name, start_date, end_date, reserver):
+                    rejected.append((reservation,
+                                     f"{device_name} ist von {start_date} bis {end_date} bereits reserviert."))
+                    continue
+                connection.execute(
+                    "INSERT INTO reservations (device_name, reserver, start_date, end_date) VALUES (?, ?, ?, ?)",
+                    (device_name, reserver, str(start_date), str(end_date))
+                )
+        return rejected
+
+    @classmethod
+    def remove_reservation(cls, device_name, start_date):
+        """Entfernt eine Reservierung basierend auf Gerät und Startdatum."""
+        with _Transaction(get_connection()) as connection:
+            connection.execute("DELETE FROM reservations WHERE device_name = ? AND start_date = ?",
+                               (device_name, str(start_date)))
+            rule = cls._rule_from_connection(connection, device_name)
+            if rule and rule.occurs_on(start_date):
+                rule.exceptions.add(to_date(start_date))
+                connection.execute("UPDATE maintenance_rules SET exceptions = ? WHERE device_name = ?",
+                                   (json.dumps(rule.to_dict()["exceptions"]), device_name))
+
+    @staticmethod
+    def _rule_from_row(row):
+        return MaintenanceRule(row["start"], row["interval"], row["end"], json.loads(row["exceptions"] or "[]"))
+
+    @classmethod
+    def _rule_from_connection(cls, connection, device_name):
+        row = connection.execute("SELECT * FROM maintenance_rules WHERE device_name = ?", (device_name,)).fetchone()
+        return cls._rule_from_row(row) if row else None
+
+    @classmethod
+    def _planned_rule_from_connection(cls, connection, device_name):
+        device = connection.execute(f"SELECT {', '.join(DEVICE_COLUMNS)} FROM devices WHERE device_name = ? LIMIT 1",
+                                    (device_name,)).fetchone()
+        return _planned_rule(cls._rule_from_connection(connection, device_name), dict(device) if device else None)
+
+    @classmethod
+    def _maintenance_rule_of(cls, device_name):
+        """Die Wartungsregel des Geräts für Konfliktprüfungen (siehe `devices._planned_rule`)."""
+        return cls._planned_rule_from_connection(get_connection(), device_name)
+
+    @staticmethod
+    def _is_available(connection, device_name, start_date, end_date, reserver=None):
+        start, end = to_date(start_date), to_date(end_date)
+        row = connection.execute(
+            "SELECT 1 FROM reservations WHERE device_name = ? AND start_date <= ? AND end_date >= ? LIMIT 1",
+            (device_name, str(end), str(start))
+        ).fetchone()
+        if row:
+            return False
+        rule = SQLiteDevice._planned_rule_from_connection(connection, device_name)
+        return _blocking_maintenance(rule, start, end, reserver) is None
+
+    @classmethod
+    def is_available(cls, device_name, start_date, end_date, reserver=None):
+        """Prüft, ob das Gerät im Zeitraum [start_date, end_date] frei ist (siehe `Device.is_available`)."""
+        return cls._is_available(get_connection(), device_name, start_date, end_date, reserver)
+
+    @classmethod
+    def find_conflicts(cls, device_name, start_date, end_date):
+        """Gibt alle Reservierungen und Wartungstermine zurück, die [start_date, end_date] überlappen."""
+        start, end = to_date(start_date), to_date(end_date)
+        conflicts = [dict(row) for row in get_connection().execute(
+            f"SELECT {', '.join(RESERVATION_COLUMNS)} FROM reservations "
+            "WHERE device_name = ? AND start_date <= ? AND end_date >= ? ORDER BY start_date",
+            (device_name, str(end), str(start))
+        )]
+        rule = cls._maintenance_rule_of(device_name)
+        if rule:
+            occurrence = next(rule.occurrences(start, end), None)
+            if occurrence:
+                conflicts.append({"device_name": device_name, "reserver": "Maintenance",
+                                  "start_date": str(occurrence), "end_date": str(occurrence)})
+        return conflicts
+
+    @classmethod
+    def find_all(cls):
+        """Liest alle Geräte aus der Datenbank und gibt sie als Objekte zurück."""
+        rows = get_connection().execute(f"SELECT {', '.join(DEVICE_COLUMNS)} FROM devices ORDER BY doc_id")
+        return [cls(**row) for row in rows]
+
+    @classmethod
+    def project(cls, *fields):
+        """Nur die angegebenen Spalten aller Geräte (siehe `Device.project`)."""
+        return _project("devices", DEVICE_COLUMNS, fields)
+
+    @classmethod
+    def iter_all(cls):
+        """Erzeugt alle Geräte nacheinander direkt aus dem Datenbank-Cursor."""
+        for row in get_connection().execute(f"SELECT {', '.join(DEVICE_COLUMNS)} FROM devices ORDER BY doc_id"):
+            yield cls(**row)
+
+    @classmethod
+    def find_by_attribute(cls, attribute, value):
+        """Findet ein Gerät basierend auf einem bestimmten Attribut und Wert."""
+        if attribute not in DEVICE_COLUMNS:
+            return None
+        row = get_connection().execute(
+            f"SELECT {', '.join(DEVICE_COLUMNS)} FROM devices WHERE {attribute} = ? ORDER BY doc_id LIMIT 1",
+            (value,)
+        ).fetchone()
+        return cls(**row) if row else None
+
+    @classmethod
+    def get_maintenance_rules(cls):
+        """Gibt die Wartungsregeln aller Geräte als Dictionary `device_name -> MaintenanceRule` zurück."""
+        rows = get_connection().execute("SELECT * FROM maintenance_rules")
+        return {row["device_name"]: cls._rule_from_row(row) for row in rows}
+
+    @classmethod
+    def delete_many(cls, device_names):
+        """Entfernt mehrere Geräte samt Reservierungen und Wartungsregeln in einer Transaktion."""
+        params = [(device_name,) for device_name in device_names]
+        with _Transaction(get_connection()) as connection:
+            for table in ("reservations", "maintenance_rules", "devices"):
+                connection.executemany(f"DELETE FROM {table} WHERE device_name = ?", params)
+
+    @classmethod
+    def find_managed_by(cls, user_id):
+        """Gibt alle Geräte zurück, für die `user_id` verantwortlich ist."""
+        rows = get_connection().execute(
+            f"SELECT {', '.join(DEVICE_COLUMNS)} FROM devices WHERE managed_by_user_id = ? ORDER BY doc_id", (user_id,))
+        return [cls(**row) for row in rows]
+
+    @classmethod
+    def reassign_managed_devices(cls, user_id, new_user_id):
+        """Überträgt alle Geräte von `user_id` an `new_user_id` und gibt ihre Anzahl zurück."""
+        return get_connection().execute("UPDATE devices SET managed_by_user_id = ? WHERE managed_by_user_id = ?",
+                                        (new_user_id, user_id)).rowcount
+
+    @classmethod
+    def _maintenance_costs(cls):
+        # Ohne Versionszähler bei SQLite: bei jedem Aufruf neu, aber vektorisiert berechnet
+        return MaintenanceCosts(lambda: [device.to_dict() for device in cls.find_all()])
+
+    @classmethod
+    def maintenance_schedule(cls):
+        """Wie `Device.maintenance_schedule`, aber ohne Cache (SQLite-Schreibvorgänge zählen keine Versionen)."""
+        return cls._build_maintenance_schedule()
+
+    @classmethod
+    def get_reservations(cls, start_date=None, end_date=None):
+        """Gibt alle Reservierungen zurück, optional nur die im Zeitraum [start_date, end_date]."""
+        sql = f"SELECT {', '.join(RESERVATION_COLUMNS)} FROM reservations WHERE 1 = 1"
+        params = []
+        if start_date is not None:
+            sql += " AND end_date >= ?"
+            params.append(str(to_date(start_date)))
+        if end_date is not None:
+            sql += " AND start_date <= ?"
+            params.append(str(to_date(end_date)))
+        reservations = [dict(row) for row in get_connection().execute(sql + " ORDER BY doc_id", params)]
+        for device_name, rule in cls.get_maintenance_rules().items():
+            reservations.extend(
+                {"device_name": device_name, "reserver": "Maintenance", "start_date": str(d), "end_date": str(d)}
+                for d in rule.occurrences(start_date, end_date)
+            )
+        return reservations
+
+
+    @classmethod
+    def _archived_reservations(cls, start_date=None, end_date=None):
+        """Die SQLite-Engine archiviert nicht; alle Reservierungen stehen in der Tabelle."""
+        return []
+
+    @classmethod
+    def _iter_stored_reservations(cls, start_date=None, end_date=None, after=None):
+        """Sortierte gespeicherte Reservierungen direkt aus dem Index auf `start_date`."""
+        sql = f"SELECT {', '.join(RESERVATION_COLUMNS)} FROM reservations WHERE start_date IS NOT NULL"
+        params = []
+        if start_date is not None:
+            sql += " AND end_date >= ?"
+            params.append(str(to_date(start_date)))
+        if end_date is not None:
+            sql += " AND start_date <= ?"
+            params.append(str(to_date(end_date)))
+        if after is not None:
+            sql += " AND (start_date, COALESCE(device_name, ''), COALESCE(reserver, '')) > (?, ?, ?)"
+            params.extend(after)
+        sql += " ORDER BY start_date, COALESCE(device_name, ''), COALESCE(reserver, '')"
+        for row in get_connection().execute(sql, params):
+            yield dict(row)
+
+    @classmethod
+    def _reservation_columns(cls, start_date=None, end_date=None):
+        """Spaltenspeicher aus der Datenbank, nur mit den Reservierungen im Zeitraum; ohne Cache."""
+        from reservation_store import ReservationColumns
+        sql = f"SELECT {', '.join(RESERVATION_COLUMNS)} FROM reservations WHERE start_date IS NOT NULL"
+        params = []
+        for condition, value in (("end_date >= ?", start_date), ("start_date <= ?", end_date)):
+            if value is not None:
+                sql += f" AND {condition}"
+                params.append(str(to_date(value)))
+        return ReservationColumns.from_rows(dict(row) for row in get_connection().execute(sql, params))
+
+    @classmethod
+    def count_reservations(cls, start_date=None, end_date=None, device_name=None, reserver=None):
+        """Anzahl der Reservierungen und Wartungstermine, die `query_reservations` liefern würde."""
+        sql = "SELECT COUNT(*) FROM reservations WHERE start_date IS NOT NULL"
+        params = []
+        for condition, value in (("end_date >= ?", start_date), ("start_date <= ?", end_date)):
+            if value is not None:
+                sql += f" AND {condition}"
+                params.append(str(to_date(value)))
+        for column, value in (("device_name", device_name), ("reserver", reserver)):
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        total = get_connection().execute(sql, params).fetchone()[0]
+        if reserver in (None, "Maintenance"):
+            total += sum(rule.count(start_date, end_date) for name, rule in cls.get_maintenance_rules().items()
+                         if device_name is None or name == device_name)
+        return total
+
+
+class SQLiteUser(User):
+    """`User` mit derselben Schnittstelle, gespeichert in SQLite statt TinyDB."""
+
+    __slots__ = ()
+
+    def store_data(self):
+        """Speichert den Nutzer in der Datenbank."""
+        get_connection().execute("INSERT INTO users (id, name) VALUES (?, ?)", (self.id, self.name))
+
+    @classmethod
+    def find_all(cls):
+        """Liest alle Nutzer aus der Datenbank und gibt sie als Objekte zurück."""
+        return [cls(**row) for row in get_connection().execute("SELECT id, name FROM users ORDER BY doc_id")]
+
+    @classmethod
+    def project(cls, *fields):
+        """Nur die angegebenen Spalten aller Nutzer (siehe `Device.project`)."""
+        return _project("users", ("id", "name"), fields)
+
+    @classmethod
+    def store_many(cls, users):
+        """Speichert mehrere Nutzer in einer Transaktion."""
+        with _Transaction(get_connection()) as connection:
+            connection.executemany("INSERT INTO users (id, name) VALUES (?, ?)", ((user.id, user.name) for user in users))
+
+    @classmethod
+    def iter_all(cls):
+        """Erzeugt alle Nutzer nacheinander direkt aus dem Datenbank-Cursor."""
+        for row in get_connection().execute("SELECT id, name FROM users ORDER BY doc_id"):
+            yield cls(**row)
+
+    @classmethod
+    def find_by_id(cls, user_id):
+        """Findet einen Nutzer basierend auf der ID."""
+        row = get_connection().execute("SELECT id, name FROM users WHERE id = ? ORDER BY doc_id LIMIT 1",
+                                       (user_id,)).fetchone()
+        return cls(**row) if row else None
+
+    @classmethod
+    def delete(cls, user_id, reassign_to=None, cascade=False):
+        """Entfernt einen Nutzer aus der Datenbank (Geräte wie bei `User.delete`)."""
+        release_devices(SQLiteDevice, user_id, reassign_to, cascade)
+        get_connection().execute("DELETE FROM users WHERE id = ?", (user_id,))
+
+
+class SQLiteMaintenanceJobs(MaintenanceJobs):
+    """`MaintenanceJobs` in der SQLite-Datenbank; Worker und Oberfläche dürfen parallel schreiben."""
+
+    @classmethod
+    def enqueue(cls, device_names):
+        """Legt je Gerät einen Auftrag an, sofern noch keiner wartet; gibt die Anzahl neuer Aufträge zurück."""
+        with _Transaction(get_connection()) as connection:
+            waiting = {row["device_name"] for row in connection.execute(
+                "SELECT device_name FROM maintenance_jobs WHERE status = ?", (PENDING,))}
+            created = timestamp()
+            params = [(name, PENDING, created) for name in dict.fromkeys(device_names) if name not in waiting]
+            connection.executemany(
+                "INSERT INTO maintenance_jobs (device_name, status, created) VALUES (?, ?, ?)", params)
+        return len(params)
+
+    @classmethod
+    def claim(cls, limit):
+        """Markiert die ältesten `limit` wartenden Aufträge als laufend und gibt sie zurück."""
+        with _Transaction(get_connection()) as connection:
+            rows = connection.execute(
+                "SELECT doc_id, device_name FROM maintenance_jobs WHERE status = ? ORDER BY doc_id LIMIT ?",
+                (PENDING, limit)
+            ).fetchall()
+            claimed = timestamp()
+            connection.executemany("UPDATE maintenance_jobs SET status = ?, claimed = ? WHERE doc_id = ?",
+                                   ((RUNNING, claimed, row["doc_id"]) for row in rows))
+        return [{"id": row["doc_id"], "device_name": row["device_name"]} for row in rows]
+
+    @classmethod
+    def complete(cls, job_ids):
+        """Markiert die Aufträge als erledigt."""
+        finished = timestamp()
+        with _Transaction(get_connection()) as connection:
+            connection.executemany("UPDATE maintenance_jobs SET status = ?, finished = ?, error = NULL WHERE doc_id = ?",
+                                   ((DONE, finished, job_id) for job_id in job_ids))
+
+    @classmethod
+    def fail(cls, job_ids, error):
+        """Markiert die Aufträge mit der Fehlermeldung `error` als fehlgeschlagen."""
+        finished = timestamp()
+        with _Transaction(get_connection()) as connection:
+            connection.executemany("UPDATE maintenance_jobs SET status = ?, finished = ?, error = ? WHERE doc_id = ?",
+                                   ((FAILED, finished, str(error), job_id) for job_id in job_ids))
+
+    @classmethod
+    def requeue_running(cls, claimed_before=None):
+        """Setzt verwaiste laufende Aufträge zurück (siehe `MaintenanceJobs.requeue_running`); gibt ihre Anzahl zurück."""
+        if claimed_before is None:
+            claimed_before = (datetime.now() - STALE_AFTER).isoformat(timespec='seconds')
+        return get_connection().execute(
+            "UPDATE maintenance_jobs SET status = ? WHERE status = ? AND (claimed IS NULL OR claimed < ?)",
+            (PENDING, RUNNING, str(claimed_before))
+        ).rowcount
+
+    @classmethod
+    def prune(cls, finished_before):
+        """Entfernt abgeschlossene Aufträge, die vor `finished_before` beendet wurden."""
+        return get_connection().execute(
+            "DELETE FROM maintenance_jobs WHERE status IN (?, ?) AND finished < ?",
+            (DONE, FAILED, str(finished_before))
+        ).rowcount
+
+    @classmethod
+    def progress(cls, failed_limit=20):
+        """Anzahl der Aufträge je Zustand, Zeitpunkt des letzten Abschlusses und die letzten Fehler."""
+        connection = get_connection()
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(connection.execute("SELECT status, COUNT(*) FROM maintenance_jobs GROUP BY status").fetchall())
+        last_finished = connection.execute("SELECT MAX(finished) FROM maintenance_jobs").fetchone()[0]
+        failed = connection.execute(
+            "SELECT device_name, finished, error FROM maintenance_jobs WHERE status = ? "
+            "ORDER BY finished DESC LIMIT ?", (FAILED, failed_limit)
+        )
+        return {**counts, "last_finished": last_finished, "failed_jobs": [dict(row) for row in failed]}
+
+
+def migrate_from_tinydb(json_path=None, sqlite_path=None):
+    """Überträgt die TinyDB-Datenbank einmalig nach SQLite (doc_ids bleiben erhalten).
+
+    Gelesen wird über den konfigurierten Storage (`DEVICE_DB_STORAGE`), also mit Journal,
+    Partitionen und archivierten Reservierungsmonaten; die archivierten Reservierungen
+    erhalten neue doc_ids, da das Archiv sie nicht mitliefert. `json_path` muss der
+    konfigurierte `DB_PATH` sein. Gibt die Anzahl der übertragenen Datensätze je Tabelle zurück.
+    """
+    if json_path is not None and os.path.abspath(json_path) != os.path.abspath(database.DB_PATH):
+        raise ValueError(f"{json_path} ist nicht die konfigurierte Datenbank {database.DB_PATH} (DEVICE_DB_PATH)")
+    columns = {
+        "users": ("id", "name"),
+        "devices": DEVICE_COLUMNS,
+        "reservations": RESERVATION_COLUMNS,
+        "maintenance_rules": ("device_name", "start", "interval", "end", "exceptions"),
+        "maintenance_jobs": ("device_name", "status", "created", "finished", "error", "claimed"),
+    }
+    connection = connect(sqlite_path)
+    counts = {}
+    # Unter der Sperre liest die Migration einen Stand, den kein anderer Prozess halb geändert hat
+    with database.lock, _Transaction(connection):
+        for table, table_columns in columns.items():
+            rows = []
+            for doc_id, doc in database.read_table(table).items():
+                if table == "maintenance_rules":
+                    doc = {**doc, "exceptions": json.dumps(doc.get("exceptions", []))}
+                rows.append([int(doc_id)] + [doc.get(column) for column in table_columns])
+            if table == "reservations":
+                rows.extend([None] + [doc.get(column) for column in table_columns]
+                            for doc in database.read_archived(table))
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {table} (doc_id, {', '.join(table_columns)}) "
+                f"VALUES ({', '.join('?' * (len(table_columns) + 1))})",
+                rows
+            )
+            counts[table] = len(rows)
+    connection.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="TinyDB-JSON-Datenbank nach SQLite migrieren.")
+    parser.add_argument("json_path", nargs="?", default=database.DB_PATH)
+    parser.add_argument("sqlite_path", nargs="?", default=database.SQLITE_PATH)
+    args = parser.parse_args()
+    # Die Datenbank wird erst beim ersten Zugriff geöffnet, der Pfad lässt sich hier noch setzen
+    database.DB_PATH = args.json_path
+    print(migrate_from_tinydb(args.json_path, args.sqlite_path))
@@ -1,6 +1,6 @@
 import streamlit as st
 from queries import find_devices
-from devices import Device
+from models import Device
 
 def display_device_management():
     # Eine Überschrift der ersten Ebene
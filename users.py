@@ -1,34 +1,94 @@
-from tinydb import TinyDB, Query
+import database
+from model_cache import bump, cached
+from indexes import HashIndex
+from devices import Device
 
-# Datenbank initialisieren
-db = TinyDB('device_management_db.json')
-users_table = db.table('users')
+# Tabelle der gemeinsamen Datenbank
+users_table = database.table('users')
+users_by_id = HashIndex(users_table, 'id')
+database.on_external_change(users_by_id.invalidate)
+
+
+class UserHasDevicesError(ValueError):
+    """Der Nutzer ist noch für Geräte verantwortlich und kann nicht einfach entfernt werden."""
+
+
+def release_devices(device_cls, user_id, reassign_to=None, cascade=False):
+    """Überträgt oder entfernt die Geräte, für die `user_id` verantwortlich ist (siehe `User.delete`)."""
+    if reassign_to is not None:
+        device_cls.reassign_managed_devices(user_id, reassign_to)
+        return
+    devices = device_cls.find_managed_by(user_id)
+    if not devices:
+        return
+    if not cascade:
+        raise UserHasDevicesError(f"{user_id} ist noch für {len(devices)} Gerät(e) verantwortlich.")
+    device_cls.delete_many(device.device_name for device in devices)
 
 class User:
+    __slots__ = ('id', 'name')
+
     def __init__(self, id, name):
         self.id = id
         self.name = name
 
+    def to_dict(self):
+        """Die gespeicherten Felder des Nutzers als Dictionary."""
+        return {field: getattr(self, field) for field in User.__slots__}
+
     def store_data(self):
         """Speichert den Nutzer in der Datenbank."""
-        users_table.insert(self.__dict__)
+        data = self.to_dict()
+        users_by_id.add(users_table.insert(data), data)
+        bump('users')
 
     @classmethod
+    def store_many(cls, users):
+        """Speichert mehrere Nutzer mit einem einzigen Schreibvorgang."""
+        data = [user.to_dict() for user in users]
+        for doc_id, doc in zip(users_table.insert_multiple(data), data):
+            users_by_id.add(doc_id, doc)
+        bump('users')
+
+    @classmethod
+    def iter_all(cls):
+        """Erzeugt alle Nutzer nacheinander, ohne eine Liste aufzubauen."""
+        for user in users_table:
+            yield cls(**user)
+
+    @classmethod
+    @cached('users')
     def find_all(cls):
         """Liest alle Nutzer aus der Datenbank und gibt sie als Objekte zurück."""
         return [cls(**user) for user in users_table.all()]
 
+    @classmethod
+    @cached('users')
+    def project(cls, *fields):
+        """Nur die angegebenen Felder aller Nutzer (wie `Device.project`)."""
+        unknown = set(fields) - set(User.__slots__)
+        if not fields or unknown:
+            raise ValueError(f"Unbekannte Felder: {sorted(unknown)}")
+        rows = database.project('users', fields)
+        return [row[0] for row in rows] if len(fields) == 1 else rows
+
     @classmethod
     def find_by_id(cls, user_id):
         """Findet einen Nutzer basierend auf der ID."""
-        UserQuery = Query()
-        result = users_table.search(UserQuery.id == user_id)
-        if result:
-            return cls(**result[0])
+        doc_id = users_by_id.first(user_id)
+        if doc_id is not None:
+            return cls(**users_table.get(doc_id=doc_id))
         return None
 
     @classmethod
-    def delete(cls, user_id):
-        """Entfernt einen Nutzer aus der Datenbank."""
-        UserQuery = Query()
-        users_table.remove(UserQuery.id == user_id)
+    def delete(cls, user_id, reassign_to=None, cascade=False):
+        """Entfernt einen Nutzer aus der Datenbank.
+
+        Seine Geräte werden an `reassign_to` übertragen oder mit `cascade=True`
+        samt Reservierungen entfernt; sonst wird ein `UserHasDevicesError` ausgelöst.
+        """
+        release_devices(Device, user_id, reassign_to, cascade)
+        doc_ids = users_by_id.pop(user_id)
+        if doc_ids:
+            users_table.remove(doc_ids=doc_ids)
+        bump('users')